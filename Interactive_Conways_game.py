@@ -1,24 +1,28 @@
-import importlib
-import matplotlib.pyplot as plt
-import numpy as np
-import pygame
-import sys
 import time
+
+_start_time = time.perf_counter()  # reference point for measuring the cold start, taken before the other imports
+
+import argparse
+import sys
 from datetime import datetime
-from screeninfo import get_monitors
+
+import numpy as np
+import pygame
 
 import Objects
 import board_script
+from edit_journal import EditJournal, apply_edit
+from simulation_worker import SimulationWorker
 
 """
 Interactive implementation of Conway's game of life using Pygame.
 Make sure to have the following libraries installed (you can install them using requirements.txt):
 - numpy
 - pygame
-- matplotlib
+- matplotlib (only needed when taking screenshots, imported on first use)
 - sys
 - datetime
-- screeninfo
+- screeninfo (only needed when the resolution is detected automatically, imported on first use)
 - importlib
 Also (albeit optionally) install the following fonts (or have the font files in the same directory as this file):
 - Minecraft, which can be found e.g. at: https://www.dafont.com/minecraft.font
@@ -29,8 +33,12 @@ Make sure to have the following files in the same directory as this file:
 - board_script.py
 - bar_oscillator_script.py
 - Objects.py
-Set up the screen resolution as desired in line 55 as ( , ) or leave it as None.
-The game will prompt the user if they want to run the game in full screen mode.
+Set up the screen resolution as desired in the user_screen variable below as ( , ), pass it on the command line as
+--resolution WIDTHxHEIGHT or leave it as None.
+The game will prompt the user if they want to run the game in full screen mode. The welcome screen can be skipped with
+--skip-welcome (add --fullscreen to start in full screen mode).
+Importing this file has no side effects: the window is only opened when the file is run (or main() is called), so the
+Game class can be used without a display.
 Playing field or Board is the region where the cells will be displayed and the game happens.
 Board and cell size are calculated based on the screen resolution.
 White cells are alive and black cells are dead.
@@ -45,6 +53,9 @@ The user can draw a spaceship by clicking the 'Spaceship' button in the menu.
 The user can take a screenshot of the game by clicking the 'Screenshot' button in the menu. The screenshot will be 
 saved in the same directory as this file. Additionally, a plot of the current board state will be saved in the same
 directory as this file.
+The user can profile the game by pressing 'F9' (cProfile) or 'F10' (sampling profiler) to start a profiling window and
+pressing it again to stop it; pressing the other key saves the window and switches to the other profiler. The profile
+is saved next to the screenshots (see frame_profiler.py).
 The user can pause updating the board. At this point user can safely add living cells or whole patterns to the board
 The user can exit the game by clicking the 'Exit' button in the menu or pressing esc button on the keyboard. A dialog 
 box will appear to confirm if the user wants to exit the game.
@@ -55,26 +66,19 @@ See more documentation in the Juptyer notebook.
 # FOR USER INPUT #
 user_screen = None # your screen resolution
 
-# WELCOME SCREEN #
-full_screen = Objects.welcome_screen()
-
 
 # GAME SETTINGS #
 
 # Screen settings
 def get_primary_resolution():
+    from screeninfo import get_monitors  # imported lazily, querying the monitors is only needed here
+
     primary_monitor = get_monitors()[0]  # Assuming the primary monitor is the first one in the list
     resolution = (primary_monitor.width, primary_monitor.height)
     print(f"Primary monitor resolution: {resolution}")
     return resolution
 
 
-if user_screen is None:
-    user_screen = get_primary_resolution()
-
-SCREEN_X, SCREEN_Y = user_screen  # your screen resolution
-WIDTH, HEIGHT = SCREEN_X // 1, SCREEN_Y // 1  # be aware of monitor scaling on windows (150%)
-
 # Colors
 
 WHITE = (255, 255, 255)
@@ -84,59 +88,100 @@ GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 
-prompts_list = ["Press 'esc' to close the game", "Press LMB to bring cells to life", "Press RMB to kill cells",
-                "Press 's' to take a screenshot",
-                "Press 'P' to pause the game"]  # List of prompts to be displayed on the screen
-
-# parameter that controls the running of the game
-running = True
-
-# Size of the cell in the game
-cell_size = HEIGHT // 120
-
-# Size and zero coordinates of the board
-length = 100 * cell_size
-zero_x = (WIDTH - length) // 2
-zero_y = (HEIGHT - length) // 2
-
-# list to store the board states
-board_list = []
-
-# Initialize Pygame
-pygame.init()
 
-# initialize the screen in pygame
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN if full_screen else 0)
-pygame.display.set_caption("Conway's Game")
-
-# initialize the clock
-clock = pygame.time.Clock()
-
-# Initialize the board
-x, y = length // cell_size, length // cell_size  # size of the board
+def gradient(stops):
+    """
+    Function to create a palette of 256 colors interpolated linearly between the given colors.
+    Args:
+        stops (list): the colors at evenly spaced positions of the palette, the first one at index 0
+    Returns:
+        palette (list): 256 RGB tuples
+    """
+    positions = np.linspace(0, 255, len(stops))
+    channels = [np.interp(np.arange(256), positions, [stop[c] for stop in stops]) for c in range(3)]
+    return [tuple(int(channel[i]) for channel in channels) for i in range(256)]
+
+
+# palettes of the board: the dead cells are black, 'age' goes from white (newborn) to red (old) and 'activity' from
+# black (quiet) to white (hot)
+PALETTES = {'cells': [BLACK] + [WHITE] * 255,
+            'age': [BLACK] + gradient([WHITE, YELLOW, (255, 128, 0), RED, (128, 0, 0)])[1:],
+            'activity': gradient([BLACK, (128, 0, 0), RED, (255, 128, 0), YELLOW, WHITE])}
+
+prompts_list = ["Press 'esc' to close the game", "Drag LMB / RMB to draw / erase",
+                "Ctrl+Z / Ctrl+Y to undo / redo",
+                "Press 's' / 'P' to screenshot / pause",
+                "Press 'c' to count the objects",
+                "Press 'r' / 'f' to rotate / mirror",
+                "Press 'h' to cycle the heatmaps",
+                "F9 / F10 to profile the game",
+                "Press '[' / ']' to change the brush",
+                "Shift + drag LMB to select"]  # List of prompts to be displayed on the screen
+
+# layers of the board
 states, counts = 0, 1
 
-# load the board from the board_script.py
-
-latest_click_time = 0
-
 
 # GAME FUNCTIONS #
 
 # restart the game of life by generating a new board
 
 class Game:
-    def __init__(self):
+    def __init__(self, width, height, screen=None, rng=None):
+        """
+        Class holding the state of the game and the functions operating on it
+        Args:
+            width (int): the width of the screen
+            height (int): the height of the screen
+            screen (None or pygame.Surface): the screen object; can be None when the game is run without a display
+            rng (None or numpy.random.Generator): the random generator used for new boards, e.g.
+                np.random.default_rng(seed) for a reproducible session
+        """
         self.running = True
-        self.cell_size = HEIGHT // 120
-        self.length = 100 * self.cell_size
-        self.zero_x = (WIDTH - self.length) // 2
-        self.zero_y = (HEIGHT - self.length) // 2
-        self.x, self.y = self.length // self.cell_size, self.length // self.cell_size
+        self.screen = screen
+        self.resize(width, height)
         self.board = None
+        self.worker = None  # simulation worker thread; when set, edits are queued instead of written to the board
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.recorder = None  # session recorder; when set, the input events are recorded
+        self.journal = EditJournal()  # undo / redo journal of the edits of the board
+        self.generation = 0  # number of generations computed by update()
+
+        # optional layers of the cells, updated together with the board and shown as heatmaps
+        self.ages = None  # number of generations each cell has been alive (uint16)
+        self.activity = None  # decaying count of the state changes of each cell (uint8)
+        self.heatmap = 'cells'  # key of the PALETTES dictionary used to draw the board
+        self._cells = None  # 8-bit surface with one pixel per inner cell, created on first use
+        self._scaled = None  # the same surface scaled to the cell size
 
         self.LMB = False
         self.RMB = False
+        self.brush = 1  # diameter of the brush in cells
+        self._stroke_ends = [None, None, None]  # last cell of the unfinished stroke of each mouse button
+        self._stroke_group = 0  # number of the current mouse stroke, its edits are undone at once
+        self.no_stroke = [False, False, False]  # True for the buttons pressed to select or paste, until released
+
+        # orientation of the pattern which is about to be placed and the cache of the pattern mockups
+        self.pattern_rotation = 0
+        self.pattern_mirrored = False
+        self._preview_key = None
+        self._patterns, self._previews = {}, {}
+
+        # rectangular selection of the board and the clipboard of the selection tools
+        self.selection = None  # (x0, y0, x1, y1) of the selected cells, the ends excluded
+        self.selecting = False  # True while the selection is dragged with the mouse
+        self._selection_start = None
+        self.clipboard = None  # copied cells, indexed [x, y] like the board
+        self.pasting = False  # True while the clipboard follows the cursor to be pasted
+        self.fill_density = 0.2  # proportion of living cells of the random fill
+        self._clipboard_preview = None
+
+        # prompts of the game, rendered on first use
+        self._pause_prompt = None
+        self._undo_prompt = None
+        self._selection_prompts = None
+        self._paste_prompt = None
+        self._exit_dialog = None
 
         self.Menu = {'Restart': [None, False],
                      'Clear': [None, False],
@@ -151,6 +196,27 @@ class Game:
 
         pass
 
+    def resize(self, width, height):
+        """
+        Lay the board out for a screen of the given size, e.g. when the window is resized. The board keeps its number of
+        cells, only the size of the cells changes.
+        Args:
+            width (int): the width of the screen
+            height (int): the height of the screen
+        """
+        self.width, self.height = width, height
+        self.cell_size = max(1, height // 120)
+        self.length = 100 * self.cell_size
+        self.zero_x = (width - self.length) // 2
+        self.zero_y = (height - self.length) // 2
+        self.x, self.y = self.length // self.cell_size, self.length // self.cell_size
+        self.border = pygame.Rect(self.zero_x, self.zero_y, self.length, self.length)  # borders of the board
+
+        # the surfaces and the prompts depending on the size of the screen are rendered again on first use
+        self._cells = self._scaled = self._clipboard_preview = None
+        self._pause_prompt = self._undo_prompt = self._selection_prompts = self._paste_prompt = None
+        self._exit_dialog = None
+
     def restart(self):
         """
         Restart the game of life by generating a new board.
@@ -158,7 +224,8 @@ class Game:
 
         if self.Menu['Restart'][1]:  # Check if the restart state in Menu dictionary is True
             print('restarting')
-            self.board = board_script.create_board(x, y)
+            new_board = board_script.create_board(self.x, self.y, rng=self.rng)
+            self.set_cells((slice(None), slice(None)), new_board[:, :, states], {'type': 'restart'})
             self.Menu['Restart'][1] = False  # Set the restart state to False
 
     # clear the board by setting all cells to 0
@@ -170,64 +237,448 @@ class Game:
 
         if self.Menu['Clear'][1]:  # Check if the clear state in Menu dictionary is True
             print('clearing')
-            self.board = np.zeros((x, y, 2), dtype=int)
+            self.set_cells((slice(None), slice(None)), 0, {'type': 'clear'})
             self.Menu['Clear'][1] = False  # Set the clear state to False
 
+    # set the state of cells on the board
+
+    def set_cells(self, index, value, event=None):
+        """
+        Set the state of the given cells.
+        If the simulation runs in a worker thread, the edit is queued and applied between generations.
+        Args:
+            index (tuple): the index of the cells in the state layer, e.g. (x, y) or (slice(None), slice(None))
+            value (int, numpy.ndarray or function): the new state(s) of the cells, or a function computing them from
+                the current states of the cells
+            event (None or dict): the input event causing the edit, recorded once the edit is applied
+        """
+        if self.worker is not None:
+            self.worker.queue_edit(index, value, event)
+        elif apply_edit(self.board[:, :, states], index, value, event, self.journal):
+            if self.recorder is not None and event is not None:
+                self.recorder.log(self.generation, event)
+
+    # undo or redo the most recent edit of the board
+
+    def undo(self):
+        """
+        Undo the most recent edit of the board (mouse stroke, pattern, clear or restart).
+        """
+        self.set_cells(None, None, {'type': 'undo'})
+
+    def redo(self):
+        """
+        Redo the most recently undone edit of the board.
+        """
+        self.set_cells(None, None, {'type': 'redo'})
+
+    # bring a single cell to life or kill it
+
+    def paint(self, x, y, value):
+        """
+        Set the state of a single cell.
+        Args:
+            x (int): the x coordinate of the cell on the board
+            y (int): the y coordinate of the cell on the board
+            value (int): 1 to bring the cell to life, 0 to kill it
+        """
+        self.set_cells((x, y), value, {'type': 'paint', 'x': int(x), 'y': int(y), 'value': value})
+
+    # place a pattern on the board
+
+    def place_pattern(self, key, x, y):
+        """
+        Place a pattern in the current orientation on the board; its columns go upwards from the given cell.
+        Args:
+            key (str): key of the pattern in the Menu dictionary
+            x (int): the x coordinate of the cell on the board
+            y (int): the y coordinate of the cell on the board
+        """
+        pattern = self.oriented_pattern(key)
+        rows, cols = pattern.shape
+        self.set_cells((x + np.arange(rows)[:, None], y - np.arange(cols)[None, :]), pattern,
+                       {'type': 'pattern', 'key': key, 'x': int(x), 'y': int(y),
+                        'rotation': self.pattern_rotation, 'mirrored': self.pattern_mirrored})
+
+    # apply a recorded input event
+
+    def apply_event(self, event):
+        """
+        Apply an input event recorded by the session recorder (see session_recorder.py).
+        Args:
+            event (dict): the recorded event
+        """
+        if event['type'] == 'paint':
+            self.paint(event['x'], event['y'], event['value'])
+        elif event['type'] == 'stroke':
+            self.paint_strokes(event['strokes'], event['brush'], event.get('group'))
+        elif event['type'] == 'region':
+            self.edit_region(event['op'], event['box'], event.get('density'), event.get('rle'))
+        elif event['type'] == 'undo':
+            self.undo()
+        elif event['type'] == 'redo':
+            self.redo()
+        elif event['type'] == 'pattern':
+            self.pattern_rotation, self.pattern_mirrored = event['rotation'], event['mirrored']
+            self.place_pattern(event['key'], event['x'], event['y'])
+        elif event['type'] == 'clear':
+            self.set_cells((slice(None), slice(None)), 0)
+        elif event['type'] == 'restart':
+            new_board = board_script.create_board(self.x, self.y, rng=self.rng)
+            self.set_cells((slice(None), slice(None)), new_board[:, :, states])
+
     # update the board state based on the number of neighbours
 
     def update(self):
         """
         Update the board state given the number of neighbors.
         """
-        # Count the neighbours
-        self.board[:, :, counts] = np.zeros((x, y), dtype=int)
-        for di in [-1, 0, 1]:
-            for dj in [-1, 0, 1]:
-                if di != 0 or dj != 0:
-                    self.board[1:x - 1, 1:y - 1, counts] += self.board[1 + di:x - 1 + di, 1 + dj:y - 1 + dj, states]
+        board_script.update_board(self.board, self.ages, self.activity)
+        self.generation += 1
         time.sleep(0.1)  # to slow down the game
 
-        # Update states based on number of neighbours
-        self.board[np.where(self.board[1:x - 1, 1:y - 1, counts] > 3)[0] + 1,
-                   np.where(self.board[1:x - 1, 1:y - 1, counts] > 3)[
-                       1] + 1, states] = 0
+    # how long the main loop can sleep before the next frame is needed
 
-        self.board[np.where(self.board[1:x - 1, 1:y - 1, counts] < 2)[0] + 1,
-                   np.where(self.board[1:x - 1, 1:y - 1, counts] < 2)[
-                       1] + 1, states] = 0
+    def frame_timeout(self, last_input):
+        """
+        Get how long the main loop can wait for input before the next frame is needed.
+        Right after an input every frame is drawn (the cursor, the hovered buttons and the queued edits change). Without
+        input nothing changes while the game is paused, and while the game runs (the exit dialog open or not) a new frame
+        is only needed for a new generation.
+        Args:
+            last_input (float): the time.perf_counter() of the last input event
+        Returns:
+            timeout (int): the time to wait for input in milliseconds, 0 to draw the next frame at the full frame rate
+        """
+        if time.perf_counter() - last_input < 0.25:
+            return 0
+        if self.Menu['Play / Pause'][1]:
+            return 500  # idle, only a safety net: any input wakes the loop up right away
+        delay = self.worker.delay if self.worker is not None else 0.1
+        return max(1, int(delay * 1000 / 2))  # twice per generation
 
-        self.board[np.where(self.board[1:x - 1, 1:y - 1, counts] == 3)[0] + 1,
-                   np.where(self.board[1:x - 1, 1:y - 1, counts] == 3)[
-                       1] + 1, states] = 1
+    # draw the cells of the board
+
+    def draw_board(self):
+        """
+        Draw the inner cells of the board, either alive / dead or as the selected heatmap.
+        The cells are written into an 8-bit surface with one pixel per cell, coloured by its palette and scaled to the
+        cell size, so drawing takes a few array operations and a single blit whatever the number of living cells.
+        """
+        x, y = self.x, self.y
+        if self._cells is None:
+            self._cells = pygame.Surface((x - 2, y - 2), depth=8)
+            self._scaled = pygame.Surface(((x - 2) * self.cell_size, (y - 2) * self.cell_size), depth=8)
+        alive = self.board[1:x - 1, 1:y - 1, states] != 0
+        if self.heatmap == 'age' and self.ages is not None:
+            # living cells are drawn with their age (newborn cells have age 1, cells painted since the last generation
+            # age 0), dead cells with index 0 whatever their stale age, e.g. after an edit killed them
+            pixels = np.where(alive, np.clip(self.ages[1:x - 1, 1:y - 1], 1, 255), 0).astype(np.uint8)
+        elif self.heatmap == 'activity' and self.activity is not None:
+            pixels = self.activity[1:x - 1, 1:y - 1]
+        else:
+            pixels = alive.view(np.uint8)
+        pygame.surfarray.blit_array(self._cells, pixels)
+        self._cells.set_palette(PALETTES[self.heatmap])
+        self._scaled.set_palette(PALETTES[self.heatmap])
+        pygame.transform.scale(self._cells, self._scaled.get_size(), self._scaled)
+        self.screen.blit(self._scaled, (self.zero_x + self.cell_size, self.zero_y + self.cell_size))
+
+    def cycle_heatmap(self):
+        """
+        Switch to the next way of drawing the board: alive / dead cells, age of the cells, activity of the cells.
+        """
+        keys = list(PALETTES.keys())
+        self.heatmap = keys[(keys.index(self.heatmap) + 1) % len(keys)]
 
     # bring cells to life or kill them by clicking the mouse
 
-    def mouse_click(self):
+    def mouse_click(self, motions=()):
         """
-        Bring cells to life or kill them by clicking the mouse within the board
+        Bring cells to life or kill them by clicking or dragging the mouse within the board (left button: alive,
+        right button: dead).
+        All mouse positions of the frame are joined by straight lines, so a fast stroke leaves no gaps whatever the
+        frame rate, and all the cells of the frame are set with a single write.
+        Args:
+            motions (list): the (position, buttons) of the mouse events of the frame in their order, the buttons as
+                returned by pygame.mouse.get_pressed()
         """
-        # Get the position of the mouse
-        pos = pygame.mouse.get_pos()
+        if self.selecting:  # the mouse drags the selection instead
+            self._stroke_ends = [None, None, None]
+            return
+        points = list(motions) + [(pygame.mouse.get_pos(), self.stroke_buttons(pygame.mouse.get_pressed()))]
+        new_stroke = all(end is None for end in self._stroke_ends)
+        strokes = []
+        for button, value in ((0, 1), (2, 0)):
+            # a stroke which was not finished in the last frame goes on from its last cell
+            stroke = [self._stroke_ends[button]] if self._stroke_ends[button] is not None else []
+            for pos, buttons in points:
+                if buttons[button]:
+                    # get the corresponding cell coordinates in the board
+                    stroke.append(((pos[0] - self.zero_x) // self.cell_size, (pos[1] - self.zero_y) // self.cell_size))
+                elif stroke:
+                    strokes.append((stroke, value))  # the button was released
+                    stroke = []
+            if stroke:
+                strokes.append((stroke, value))
+            self._stroke_ends[button] = stroke[-1] if stroke else None
+        if strokes:
+            self._stroke_group += new_stroke
+            self.paint_strokes(strokes, group=self._stroke_group)
+
+    def stroke_buttons(self, buttons):
+        """
+        Get the mouse buttons which draw a stroke: a button pressed to select, deselect, paste or stop pasting draws
+        nothing until it is released.
+        Args:
+            buttons (tuple): the pressed buttons, as returned by pygame.mouse.get_pressed()
+        Returns:
+            buttons (tuple): the pressed buttons which draw a stroke
+        """
+        for button, pressed in enumerate(buttons[:3]):
+            if not pressed:
+                self.no_stroke[button] = False  # released, even if the MOUSEBUTTONUP event was missed
+        return tuple(pressed and not self.no_stroke[button] for button, pressed in enumerate(buttons[:3]))
+
+    # set the cells along strokes of the mouse
+
+    def paint_strokes(self, strokes, brush=None, group=None):
+        """
+        Set the state of the cells along strokes of the mouse with a single write; cells outside of the board are
+        ignored.
+        Args:
+            strokes (list): one (points, value) pair per stroke, the points being the (x, y) cells the mouse went
+                through and the value 1 to bring the cells to life or 0 to kill them
+            brush (None or int): the diameter of the brush in cells; the current brush size if None
+            group (None or int): the number of the mouse stroke, all edits of a stroke are undone at once
+        """
+        brush = self.brush if brush is None else brush
+        xs, ys, values = [], [], []
+        for points, value in strokes:
+            stroke_xs, stroke_ys = board_script.stroke_cells(points, brush, (self.x, self.y))
+            xs.append(stroke_xs)
+            ys.append(stroke_ys)
+            values.append(np.full(len(stroke_xs), value))
+        xs, ys, values = np.concatenate(xs), np.concatenate(ys), np.concatenate(values)
+        if len(xs) == 0:
+            return  # the strokes are outside of the board
+        self.set_cells((xs, ys), values,
+                       {'type': 'stroke', 'brush': brush, 'group': group,
+                        'strokes': [[[[int(px), int(py)] for px, py in points], value] for points, value in strokes]})
+
+    # change the size of the brush
+
+    def change_brush(self, step):
+        """
+        Change the diameter of the brush used to paint the cells.
+        Args:
+            step (int): the change of the diameter in cells, e.g. 2 or -2
+        """
+        self.brush = min(max(self.brush + step, 1), 15)
 
-        # get the corresponding cell coordinates in the board
-        x, y = pos
-        x = (x - zero_x) // cell_size
-        y = (y - zero_y) // cell_size
+    # select a rectangle of the board with the mouse
 
-        if border.collidepoint(pos):  # Check if the mouse is within the board
-            if pygame.mouse.get_pressed()[0]:  # Check if the left mouse button is pressed
-                self.board[x, y, states] = 1  # Bring the cell to life
-            if pygame.mouse.get_pressed()[2]:  # Check if the right mouse button is pressed
-                self.board[x, y, states] = 0  # Kill the cell
+    def cell_at(self, pos):
+        """
+        Get the cell of the board at a position of the screen.
+        Args:
+            pos (tuple): the position on the screen
+        Returns:
+            x, y (int): the coordinates of the cell, possibly outside of the board
+        """
+        return (pos[0] - self.zero_x) // self.cell_size, (pos[1] - self.zero_y) // self.cell_size
+
+    def start_selection(self, pos):
+        """
+        Start dragging a new selection from the given position.
+        Args:
+            pos (tuple): the position of the mouse on the screen
+        """
+        self.selecting = True
+        self._selection_start = self.cell_at(pos)
+        self.drag_selection(pos)
+
+    def drag_selection(self, pos):
+        """
+        Extend the selection being dragged to the given position.
+        Args:
+            pos (tuple): the position of the mouse on the screen
+        """
+        (x0, y0), (x1, y1) = self._selection_start, self.cell_at(pos)
+        self.select(min(x0, x1), min(y0, y1), max(x0, x1) + 1, max(y0, y1) + 1)
+
+    def select(self, x0, y0, x1, y1):
+        """
+        Select a rectangle of the board, clipped to the inner cells (the cells on the edges are never selected).
+        Args:
+            x0, y0 (int): the first cell of the rectangle
+            x1, y1 (int): the end of the rectangle, excluded
+        """
+        x0, y0, x1, y1 = max(x0, 1), max(y0, 1), min(x1, self.x - 1), min(y1, self.y - 1)
+        self.selection = (x0, y0, x1, y1) if x0 < x1 and y0 < y1 else None
+
+    # edit a rectangle of the board
+
+    def edit_region(self, op, box=None, density=None, rle=None):
+        """
+        Apply a bulk edit to a rectangle of the board as a single slice operation of the state layer.
+        Args:
+            op (str): 'fill', 'clear', 'invert', 'random' (random cells at the given density), 'paste' (the pattern
+                with its first cell at the first cell of the box), 'rotate' (by 90 degrees, in place) or 'mirror'
+            box (None or tuple): the (x0, y0, x1, y1) of the rectangle, the ends excluded; the selection if None
+            density (None or float): the proportion of living cells of 'random'; the fill density if None
+            rle (None or str): the pattern of 'paste' in RLE; the clipboard if None
+        """
+        box = self.selection if box is None else tuple(box)
+        if box is None:
+            return
+        x0, y0, x1, y1 = box
+        event = {'type': 'region', 'op': op, 'box': [int(x0), int(y0), int(x1), int(y1)]}
+        width, height = x1 - x0, y1 - y0
+
+        if op == 'fill':
+            value = 1
+        elif op == 'clear':
+            value = 0
+        elif op == 'invert':
+            value = np.logical_not  # computed from the current states when the edit is applied
+        elif op == 'random':
+            density = self.fill_density if density is None else density
+            event['density'] = density
+            # the same random cells as a new board of the size of the box (without its dead edges)
+            value = board_script.create_board(width + 2, height + 2, density, self.rng)[1:-1, 1:-1, states]
+        elif op == 'paste':
+            rle = board_script.pattern_to_rle(self.clipboard) if rle is None else rle
+            event['rle'] = rle
+            pattern = board_script.pattern_from_rle(rle)
+            x1, y1 = x0 + pattern.shape[0], y0 + pattern.shape[1]
+            value = pattern
+        elif op == 'rotate':
+            # the rotated cells keep the first cell of the rectangle: the edit covers both rectangles
+            x1, y1 = max(x1, x0 + height), max(y1, y0 + width)
+
+            def value(cells):
+                rotated = np.rot90(cells[:width, :height] != 0)
+                cells = np.array(cells)
+                cells[:width, :height] = 0
+                cells[:height, :width] = rotated[:cells.shape[0], :cells.shape[1]]
+                return cells
+        elif op == 'mirror':
+            def value(cells):
+                return cells[::-1, :].copy()
+        else:
+            raise ValueError(f'Unknown region edit: {op}')
+
+        # Clip the rectangle to the inner cells of the board
+        cx0, cy0, cx1, cy1 = max(x0, 1), max(y0, 1), min(x1, self.x - 1), min(y1, self.y - 1)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return
+        if isinstance(value, np.ndarray):
+            value = value[cx0 - x0:cx1 - x0, cy0 - y0:cy1 - y0]
+        self.set_cells((slice(cx0, cx1), slice(cy0, cy1)), value, event)
+        if op == 'rotate' and self.selection == box:
+            self.select(x0, y0, x0 + height, y0 + width)  # the selection follows the rotated cells
+
+    # copy, cut and paste the selection
+
+    def copy_selection(self):
+        """
+        Copy the cells of the selection to the clipboard.
+        """
+        if self.selection is not None:
+            x0, y0, x1, y1 = self.selection
+            self.clipboard = (self.board[x0:x1, y0:y1, states] != 0).astype(np.uint8)
+            self._clipboard_preview = None
+
+    def cut_selection(self):
+        """
+        Copy the cells of the selection to the clipboard and clear them.
+        """
+        if self.selection is not None:
+            self.copy_selection()
+            self.edit_region('clear')
+
+    def paste(self):
+        """
+        Let the clipboard follow the cursor; it is pasted by clicking the left mouse button (see draw_paste).
+        """
+        self.pasting = self.clipboard is not None
+
+    def export_clipboard(self):
+        """
+        Save the clipboard in RLE, in the same directory as the screenshots.
+        Returns:
+            filename (None or str): the name of the saved file, None if the clipboard is empty
+        """
+        if self.clipboard is None:
+            return None
+        filename = f'clipboard_{datetime.now().strftime("%Y%m%d_%H%M%S")}.rle'
+        with open(filename, 'w') as file:
+            file.write(board_script.pattern_to_rle(self.clipboard))
+        print(f'clipboard saved to {filename}')
+        return filename
+
+    def change_density(self, step):
+        """
+        Change the proportion of living cells of the random fill.
+        Args:
+            step (float): the change of the density, e.g. 0.05 or -0.05
+        """
+        self.fill_density = round(min(max(self.fill_density + step, 0.05), 0.95), 2)
+
+    def draw_selection(self):
+        """
+        Draw the outline of the selection and the prompt of the selection tools.
+        """
+        if self.selection is None:
+            return
+        x0, y0, x1, y1 = self.selection
+        pygame.draw.rect(self.screen, YELLOW, (self.zero_x + x0 * self.cell_size, self.zero_y + y0 * self.cell_size,
+                                               (x1 - x0) * self.cell_size, (y1 - y0) * self.cell_size), 1)
+        if self._selection_prompts is None:  # the prompts are rendered once, the density is updated when changed
+            style = Objects.Objects(text_color="YELLOW", font_size=24)
+            self._selection_prompts = [Objects.Widget(style, '', self.width // 2, self.height - 90 + 30 * i,
+                                                      align='center', frame_width=-1) for i in range(2)]
+        self._selection_prompts[0].set_text(f"Selection: 'a' fill, Del clear, 'i' invert, 'n' random "
+                                            f"({self.fill_density:.0%}, '-' / '=' to change), 'r' / 'f' rotate / mirror")
+        self._selection_prompts[1].set_text("Ctrl+C / Ctrl+X / Ctrl+V / Ctrl+E to copy / cut / paste / export as RLE, "
+                                            "Shift+RMB to deselect")
+        for prompt in self._selection_prompts:
+            prompt.draw(self.screen)
+
+    def draw_paste(self):
+        """
+        Draw the clipboard at the cursor while pasting and paste it by clicking the left mouse button within the board.
+        The paste mode is left by clicking the right mouse button.
+        """
+        if not self.pasting:
+            return
+        if self._clipboard_preview is None:
+            self._clipboard_preview = self.render_cells(self.clipboard)
+        pos = pygame.mouse.get_pos()
+        self.screen.blit(self._clipboard_preview, pos)
+        if self._paste_prompt is None:
+            style = Objects.Objects(text_color="RED", font_size=24)
+            self._paste_prompt = Objects.Widget(style, "Press LMB to paste, RMB to stop pasting, 'r' / 'f' to "
+                                                       "rotate / mirror", self.width // 2, self.height - 50,
+                                                align='center', frame_width=-1)
+        self._paste_prompt.draw(self.screen)
+        if self.LMB and self.border.collidepoint(pos):
+            x, y = self.cell_at(pos)
+            self.edit_region('paste', (x, y, x + self.clipboard.shape[0], y + self.clipboard.shape[1]))
+        if self.RMB:
+            self.pasting = False
 
     # draw a red rectangle around the cell the cursor is currently on
 
     def cursor(self):
         """
-        Draw a red rectangle around the cell the cursor is currently on.
+        Draw a red rectangle around the cell the cursor is currently on, as large as the brush.
         """
         pos = pygame.mouse.get_pos()
-        pygame.draw.rect(screen, RED, (pos[0], pos[1], self.cell_size, self.cell_size), self.cell_size)
+        size = self.brush * self.cell_size
+        corner = (self.brush // 2) * self.cell_size
+        pygame.draw.rect(self.screen, RED, (pos[0] - corner, pos[1] - corner, size, size), self.cell_size)
 
     # take a screenshot of the game
 
@@ -239,7 +690,9 @@ class Game:
         """
         if self.Menu['Screenshot'][1]:  # Check if the screenshot state is True
             filename = f'game_of_life_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-            pygame.image.save(screen, filename)
+            pygame.image.save(self.screen, filename)
+            import matplotlib.pyplot as plt  # imported lazily, matplotlib is only needed for the plot
+
             fig, ax = plt.subplots()
             plt.imshow(self.board[:, :, states], cmap='gray')
             ax.set_xticks([])
@@ -255,16 +708,44 @@ class Game:
         """
 
         if self.Menu['Exit'][1]:  # Check if the exit_window state is True
-            dialog_box = Objects.Objects(text_color="BLACK")  # load the dialog box class from the archive_objects.py
+            if self._exit_dialog is None:  # the dialog box is rendered once and then only blitted
+                self._exit_dialog = self.render_exit_diag()
+            background, dialog_frame, yes, no = self._exit_dialog
 
-            # Call the dialog box method to display the dialog box and get the yes and no buttons
-            yes, no = dialog_box.dialog_box(screen, 'Do you really want to quit?')
+            pos = pygame.mouse.get_pos()
+            self.screen.blit(background, dialog_frame)
+            for button in (yes, no):
+                button.hovered = button.frame.collidepoint(pos)
+                button.draw(self.screen)
 
-            if dialog_box.is_clicked(yes, self.LMB):  # Call the is_clicked method to check if the yes button is clicked
+            if yes.style.is_clicked(yes.frame, self.LMB):  # Check if the yes button is clicked
                 self.running = False
-            if dialog_box.is_clicked(no, self.LMB):
+            if no.style.is_clicked(no.frame, self.LMB):
                 self.Menu['Exit'][1] = False
 
+    def render_exit_diag(self):
+        """Render the dialog box to confirm the exit once, with the layout of Objects.Objects.dialog_box.
+        Returns:
+            background (pygame.Surface): the white frame of the dialog box with the prompt message
+            dialog_frame (pygame.Rect): the rectangle object of the dialog box
+            yes (Objects.Widget): the yes button
+            no (Objects.Widget): the no button
+        """
+        style = Objects.Objects(text_color="BLACK")  # load the dialog box class from the archive_objects.py
+        prompt = style.font.render('Do you really want to quit?', True, style.text_color)  # Render the text
+        prompt_box = prompt.get_rect(center=(self.width // 2, self.height // 2))
+        dialog_frame = prompt_box.inflate(50, 100)  # Create the dialog box frame
+        prompt_box.midtop = dialog_frame.midtop[0], dialog_frame.midtop[1] + 10  # Align the prompt message
+
+        background = pygame.Surface(dialog_frame.size)
+        background.fill('WHITE')
+        background.blit(prompt, (prompt_box.x - dialog_frame.x, prompt_box.y - dialog_frame.y))
+
+        x, y = dialog_frame.midbottom
+        yes = Objects.Widget(style, 'Yes', x - style.inf_coeff - 10, y - style.inf_coeff - 10, 'bottomright')
+        no = Objects.Widget(style, ' No ', x + style.inf_coeff + 10, y - style.inf_coeff - 10, 'bottomleft')
+        return background, dialog_frame, yes, no
+
     # convert the pattern string to a numpy array
 
     def pattern_from_str(self, pattern_str):
@@ -275,31 +756,15 @@ class Game:
         Returns:
             pattern_array (numpy.ndarray): the pattern as a numpy array
         """
-        # Split the pattern string into lines and remove empty lines
-        pattern_lines = pattern_str.strip().split('\n')
-        for i in range(len(pattern_lines)):
-            pattern_lines[i] = pattern_lines[i].strip()  # Remove leading and trailing whitespaces in each line
-        # Determine the size of the pattern
-        rows = len(pattern_lines)
-        cols = len(pattern_lines[0])
-
-        # Create a numpy array to store the pattern
-        pattern_array = np.zeros((rows, cols), dtype=int)
-
-        # Convert the pattern string to a numpy array
-        for i, line in enumerate(pattern_lines):  # Loop through the pattern lines
-            for j, char in enumerate(line):  # Loop through the characters in the line
-                if char == 'O':  # Check if the character is 'O'
-                    pattern_array[i, j] = 1  # Set the corresponding element in the numpy array to 1
-
-        return np.rot90(pattern_array)
+        return board_script.pattern_from_str(pattern_str)
 
     # draw the pattern on the board
 
     def draw_pattern(self):
         """
         Checks if any pattern was selected from the menu and draws it.
-        The pattern is drawn by calling the create_pattern function from the corresponding script.
+        The pattern is drawn by calling the create_pattern function from the corresponding script. Its mockup is
+        rendered once per orientation and cell size (see pattern_preview) and can be rotated and mirrored.
         The pattern is displayed near the mouse position and can be placed on the playing field by clicking the left mouse
         button within the playing field.
         The choice can be undone by clicking the right mouse button.
@@ -310,46 +775,125 @@ class Game:
         for key in self.Menu.keys():  # Loop through the Menu dictionary keys
             if self.Menu[key][
                 1] and key not in restricted:  # Check if any pattern is selected (i.e. second element in the list is True)
-                script = importlib.import_module(self.Menu[key][
-                                                     2])  # import the corresponding script from the Menu dictionary (using the third element in the list)
-
-                pattern = script.create_pattern()  # Call the create_pattern function from the script
-
-                # Check if the pattern is given as string lines
-                if type(pattern) == str:
-                    pattern = self.pattern_from_str(pattern)  # convert the pattern string to a numpy array
+                pattern, preview = self.pattern_preview(key)  # the (rotated / mirrored) pattern and its sprite
 
-                # Display the pattern mockup near the mouse position
+                # Display the pattern mockup near the mouse position (the pattern's columns are drawn upwards)
                 pos = pygame.mouse.get_pos()
-                for i in range(0, len(pattern)):
-                    for j in range(0, len(pattern[0])):
-                        if pattern[i][j] == 1:
-                            pygame.draw.rect(screen, WHITE,
-                                             (pos[0] + i * cell_size, pos[1] - j * self.cell_size, self.cell_size,
-                                              self.cell_size))
-
-                undo_prompt = Objects.Objects(text_color="RED",
-                                              font_size=24)  # load the undo prompt class from the archive_objects.py with specific options
-                undo_prompt.draw_text_box(screen, "Press RMB to undo your choice. Press LMB to place the pattern",
-                                          WIDTH // 2, HEIGHT - 50, align='center',
-                                          frame_width=-1)  # Display the undo prompt
+                self.screen.blit(preview, (pos[0], pos[1] - (len(pattern[0]) - 1) * self.cell_size))
+
+                if self._undo_prompt is None:  # the prompt is rendered once and then only blitted
+                    undo_prompt = Objects.Objects(text_color="RED",
+                                                  font_size=24)  # load the undo prompt class from the archive_objects.py with specific options
+                    self._undo_prompt = Objects.Widget(undo_prompt,
+                                                       "Press RMB to undo your choice. Press LMB to place the pattern",
+                                                       self.width // 2, self.height - 50, align='center',
+                                                       frame_width=-1)
+                self._undo_prompt.draw(self.screen)  # Display the undo prompt
                 # Place the pattern on the board
-                if border.collidepoint(pygame.mouse.get_pos()):  # Check if the mouse is within the board
+                if self.border.collidepoint(pygame.mouse.get_pos()):  # Check if the mouse is within the board
                     if self.LMB:  # Check if the left mouse button is pressed
 
                         # convert the mouse position to the board coordinates
                         x, y = pos
-                        x = (x - zero_x) // cell_size
-                        y = (y - zero_y) // cell_size
+                        x = (x - self.zero_x) // self.cell_size
+                        y = (y - self.zero_y) // self.cell_size
 
-                        # place the pattern on the board
-                        for i in range(0, len(pattern)):
-                            for j in range(0, len(pattern[0])):
-                                self.board[x + i, y - j, states] = pattern[i][j]
+                        # place the pattern on the board (the pattern's columns are drawn upwards from the cursor)
+                        self.place_pattern(key, x, y)
 
                 if self.RMB:  # Check if the right mouse button is pressed
                     self.Menu[key][1] = False  # Undo the choice
 
+    # rotate or mirror the pattern which is about to be placed
+
+    def rotate_pattern(self):
+        """
+        Rotate by 90 degrees the clipboard being pasted, otherwise the selected pattern, otherwise the cells of the
+        selection in place.
+        """
+        if self.pasting:
+            self.clipboard = np.rot90(self.clipboard).copy()
+            self._clipboard_preview = None
+        elif self.selection is not None and not self.pattern_chosen():
+            self.edit_region('rotate')
+        else:
+            self.pattern_rotation = (self.pattern_rotation + 1) % 4
+
+    def mirror_pattern(self):
+        """
+        Mirror the clipboard being pasted, otherwise the selected pattern, otherwise the cells of the selection in place.
+        """
+        if self.pasting:
+            self.clipboard = self.clipboard[::-1, :].copy()
+            self._clipboard_preview = None
+        elif self.selection is not None and not self.pattern_chosen():
+            self.edit_region('mirror')
+        else:
+            self.pattern_mirrored = not self.pattern_mirrored
+
+    def pattern_chosen(self):
+        """
+        Check if a pattern of the menu is about to be placed.
+        Returns:
+            True if a pattern is selected in the menu, False otherwise
+        """
+        return any(value[1] for value in self.Menu.values() if len(value) > 2)
+
+    # get a pattern and its pre-rendered mockup
+
+    def oriented_pattern(self, key):
+        """
+        Get the pattern of a menu entry in the current orientation.
+        The patterns are loaded once from their scripts and kept until the cell size or the patterns in the Menu
+        dictionary change.
+        Args:
+            key (str): key of the pattern in the Menu dictionary
+        Returns:
+            pattern (numpy.ndarray): the pattern in the current orientation
+        """
+        cache_key = (self.cell_size, tuple((entry, value[2]) for entry, value in self.Menu.items() if len(value) > 2))
+        if cache_key != self._preview_key:
+            self._preview_key = cache_key
+            self._patterns, self._previews = {}, {}
+
+        if key not in self._patterns:
+            self._patterns[key] = board_script.load_pattern(self.Menu[key][2])  # load the pattern from its script
+        pattern = self._patterns[key][::-1, :] if self.pattern_mirrored else self._patterns[key]
+        return np.rot90(pattern, self.pattern_rotation)
+
+    def pattern_preview(self, key):
+        """
+        Get the pattern of a menu entry in the current orientation together with its mockup.
+        The mockup is rendered once into a Surface and cached for every pattern and orientation, so displaying it
+        takes a single blit whatever the size of the pattern. The cache is only emptied when the cell size or the
+        patterns in the Menu dictionary change.
+        Args:
+            key (str): key of the pattern in the Menu dictionary
+        Returns:
+            pattern (numpy.ndarray): the pattern in the current orientation
+            preview (pygame.Surface): the mockup of the pattern, dead cells are transparent
+        """
+        pattern = self.oriented_pattern(key)  # also empties the caches if the cell size or the patterns changed
+        orientation = (key, self.pattern_rotation, self.pattern_mirrored)
+        if orientation not in self._previews:
+            # flipped so the columns of the pattern go upwards
+            self._previews[orientation] = (pattern, self.render_cells(pattern[:, ::-1]))
+        return self._previews[orientation]
+
+    def render_cells(self, cells):
+        """
+        Render cells with one pixel per cell, scaled to the cell size.
+        Args:
+            cells (numpy.ndarray): the cells indexed [x, y] like the board (nonzero is alive)
+        Returns:
+            surface (pygame.Surface): the living cells in white, the dead cells are transparent
+        """
+        pixels = (cells != 0).astype(np.uint8) * 255
+        surface = pygame.surfarray.make_surface(np.dstack([pixels] * 3))
+        surface = pygame.transform.scale(surface, (cells.shape[0] * self.cell_size, cells.shape[1] * self.cell_size))
+        surface.set_colorkey(BLACK)
+        return surface
+
     def change_state(self, key, dict):
         """
         Changes state of the dictionary entry
@@ -360,98 +904,336 @@ class Game:
             changed value
         """
         dict[key][1] = not dict[key][1]
+        if self.recorder is not None and dict is self.Menu:
+            generation = self.worker.generation if self.worker is not None else self.generation
+            self.recorder.log(generation, {'type': 'toggle', 'key': key})
 
     def paused(self):
         if self.Menu['Play / Pause'][1]:
-            pause_prompt = Objects.Objects(text_color="RED",
-                                           font_size=36)  # load the undo prompt class from the archive_objects.py with specific options
-            pause_prompt.draw_text_box(screen, 'Game paused', (WIDTH - length) // 4, HEIGHT // 4, frame_width=-1)
+            if self._pause_prompt is None:  # the prompt is rendered once and then only blitted
+                pause_prompt = Objects.Objects(text_color="RED",
+                                               font_size=36)  # load the undo prompt class from the archive_objects.py with specific options
+                self._pause_prompt = Objects.Widget(pause_prompt, 'Game paused', (self.width - self.length) // 4,
+                                                    self.height // 4, frame_width=-1)
+            self._pause_prompt.draw(self.screen)
+
+
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line options of the game.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    Returns:
+        args (argparse.Namespace): the parsed options
+    """
+    parser = argparse.ArgumentParser(description="Interactive Conway's game of life")
+    parser.add_argument('--skip-welcome', action='store_true',
+                        help='do not show the welcome screen (use --fullscreen to start in full screen mode)')
+    parser.add_argument('--fullscreen', action='store_true', help='run the game in full screen mode')
+    parser.add_argument('--resolution', default=None,
+                        help='screen resolution as WIDTHxHEIGHT; detected from the primary monitor if not given')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random boards (random if not given)')
+    parser.add_argument('--record', default=None, help='record the session to this file (see session_recorder.py)')
+    parser.add_argument('--archive', default=None,
+                        help='archive every generation of the run to this file (see run_archive.py)')
+    args = parser.parse_args(argv)
+    if args.resolution is not None:
+        args.resolution = tuple(int(value) for value in args.resolution.lower().split('x'))
+    return args
+
+
+def fit_prompts(lines, width, height, font_size=24):
+    """
+    Function to create the style of the prompts with the largest font size (up to font_size) at which the prompts fit
+    into the column next to the board, one line every two font sizes.
+    Args:
+        lines (list): the prompts
+        width (int): the width of the column in pixels
+        height (int): the height of the column in pixels
+        font_size (int): the largest font size
+    Returns:
+        style (Objects.Objects): the text box object of the prompts
+    """
+    for size in range(font_size, 7, -1):
+        style = Objects.Objects(text_color="WHITE", font_size=size)
+        margin = style.inf_coeff // 2  # the frames of the text boxes are inflated on each side
+        if (max(style.font.size(line)[0] for line in lines) + margin <= width and
+                size * 2 * (len(lines) - 1) + margin <= height):
+            return style
+    return style
+
+
+def layout_ui(game):
+    """
+    Lay out the title, the menu buttons, the prompts and the lines of the object census for the screen of the game.
+    The widgets are rendered once and afterwards only blitted, until the window is resized.
+    Args:
+        game (Game): the game, laid out for the size of the screen
+    Returns:
+        ui (Objects.WidgetTree): the title, the menu buttons and the prompts
+        census_lines (list): the widgets of the lines of the object census
+    """
+    width, height = game.width, game.height
+    zero_y, length, column = game.zero_y, game.length, game.zero_x + game.length + 10
+
+    menu_button = Objects.Objects(obj_color="WHITE", text_color="WHITE",
+                                  font_size=24)  # load the buttons class from the Objects.py with specific options
+    header = Objects.Objects(text_color='WHITE',
+                             font_size=48)  # load the header class from the Objects.py with specific options
+    # the prompts are shown in the column right of the board, the font is shrunk until they fit on small screens
+    prompts = fit_prompts(prompts_list, width - column, height - height // 2)
+
+    ui = Objects.WidgetTree()
+    ui.add(Objects.Widget(header, "Conway's game of life", width // 2, 50, frame_width=-1))  # the title
+    for i, key in enumerate(reversed(game.Menu.keys())):  # Loop through the Menu dictionary keys in reverse order
+        # the buttons are placed from down to up
+        button = ui.add(Objects.Widget(menu_button, key, (width - length) // 4,
+                                       (zero_y + length) - menu_button.font_size * 3 * i - 20, name=key))
+        game.Menu[key][0] = button.frame
+    for i, prompt in enumerate(prompts_list):  # Loop through the list of prompts
+        ui.add(Objects.Widget(prompts, prompt, column, height // 2 + prompts.font_size * 2 * i,
+                              align='bottomleft', frame_width=-1))
+    ui.layout((width, height))
+    census_lines = [Objects.Widget(prompts, '', column, zero_y + 30 + prompts.font_size * 2 * i,
+                                   align='bottomleft', frame_width=-1) for i in range(9)]
+    return ui, census_lines
 
 
 # MAIN LOOP
-menu_button = Objects.Objects(obj_color="WHITE", text_color="WHITE",
-                              font_size=24)  # load the buttons class from the Objects.py with specific options
-header = Objects.Objects(text_color='WHITE',
-                         font_size=48)  # load the header class from the Objects.py with specific options
-prompts = Objects.Objects(text_color="WHITE",
-                          font_size=24)  # load the prompts class from the archive_objects.py with specific options
-
-game = Game()
-game.board = board_script.create_board(x, y)
-while game.running:
-    game.LMB, game.RMB = False, False
-    screen.fill(BLACK)  # Fill the screen with black
-    pygame.mouse.set_visible(False)  # Hide the mouse cursor
-    border = pygame.draw.rect(screen, RED, (zero_x, zero_y, length, length), 2)  # Draw the borders
-    header.draw_text_box(screen, "Conway's game of life", x=WIDTH // 2, y=50, frame_width=-1)  # Draw the title
-
-    ## Core game functions ##
-    # Plot the cells
-    for k in range(1, x - 1):
-        for j in range(1, y - 1):
-            if game.board[k, j, states] == 1:
-                pygame.draw.rect(screen, WHITE,
-                                 (zero_x + k * cell_size, zero_y + j * game.cell_size, game.cell_size, game.cell_size))
-
-    game.mouse_click()  # Bring cells to life or kill them by clicking the mouse
-
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:  # Close the game by clicking the 'x' button
-            running = False
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_s:
-                game.Menu['Screenshot'][1] = True  # Call the state_screenshot function from the Menu dictionary
-            if event.key == pygame.K_ESCAPE:  # Press 'esc' to exit the game
-                if not game.Menu['Exit'][1]:
-                    game.Menu['Exit'][1] = True  # Call the exit function from the Menu dictionary
-                else:
-                    game.Menu['Exit'][1] = False
-            if event.key == pygame.K_p:
-                game.change_state('Play / Pause', game.Menu)
-        if event.type == pygame.MOUSEBUTTONDOWN:
-
-            if event.button == 1:
-                game.LMB = True
-            if event.button == 3:
-                game.RMB = True
-
-    ## Create Menu ##
-    for i, key in enumerate(reversed(game.Menu.keys())):  # Loop through the Menu dictionary keys in reverse order
-
-        # Draw the buttons by calling the render method from the buttons class from down to up
-        game.Menu[key][0] = menu_button.draw_text_box(screen, key, (WIDTH - length) // 4,
-                                                      (zero_y + length) - menu_button.font_size * 3 * i - 20)
 
-        # Check if the button is clicked and no other button was clicked (except Play / Pause)
+def main(argv=None):
+    """
+    Open the window and run the main loop of the game.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    global _start_time
+
+    args = parse_args(argv)
+
+    # WELCOME SCREEN #
+    full_screen = args.fullscreen
+    if not args.skip_welcome:
+        welcome_start = time.perf_counter()
+        full_screen = Objects.welcome_screen()
+        _start_time += time.perf_counter() - welcome_start  # the time spent on the welcome screen is not counted
+
+    resolution = args.resolution or user_screen
+    if resolution is None:
+        resolution = get_primary_resolution()
+
+    SCREEN_X, SCREEN_Y = resolution  # your screen resolution
+    WIDTH, HEIGHT = SCREEN_X // 1, SCREEN_Y // 1  # be aware of monitor scaling on windows (150%)
+
+    # Initialize only the pygame modules the game uses (pygame.init() would also start the audio mixer)
+    pygame.display.init()
+    pygame.font.init()
+
+    # initialize the screen in pygame
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN if full_screen else pygame.RESIZABLE)
+    pygame.display.set_caption("Conway's Game")
+
+    # initialize the clock
+    clock = pygame.time.Clock()
+
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().generate_state(1)[0])
+    game = Game(WIDTH, HEIGHT, screen, rng=np.random.default_rng(seed))
+    x, y = game.x, game.y  # size of the board
+    ui, census_lines = layout_ui(game)  # laid out again when the window is resized
+    # run the simulation in a separate thread, together with the age and activity layers of the heatmaps
+    worker = SimulationWorker(board_script.create_board(x, y, rng=game.rng), layers=True)
+    game.worker = worker
+    worker.journal = game.journal  # the edits are applied (and journaled) by the worker
+    if args.record is not None:
+        from session_recorder import SessionRecorder  # imported lazily, only needed for recording
+
+        game.recorder = worker.recorder = SessionRecorder(args.record, seed, WIDTH, HEIGHT)
+    if args.archive is not None:
+        from run_archive import ArchiveWriter  # imported lazily, only needed for archiving
+
+        worker.archive = ArchiveWriter(args.archive, x, y)
+        worker.archive.append(worker.generation, worker.latest()[:, :, states])  # the initial board
+    game.board = worker.latest()
+    worker.start()
+    recogniser = None  # object recogniser, created when the object census is shown for the first time
+    profiler = None  # profiler of the game, created when a profiling window is started for the first time
+    show_census, census, census_generation = False, {}, None
+    first_frame = True
+    last_input = time.perf_counter()  # time of the last input event, frames are drawn at full rate shortly after it
+    pending = []  # event which woke the idle loop up, handled with the next frame
+    while game.running:
+        game.LMB, game.RMB = False, False
+        game.board = worker.latest()  # draw the latest complete generation
+        game.ages, game.activity = worker.layers()
+        screen.fill(BLACK)  # Fill the screen with black
+        pygame.mouse.set_visible(False)  # Hide the mouse cursor
+        pygame.draw.rect(screen, RED, game.border, 2)  # Draw the borders
+
+        ## Core game functions ##
+        game.draw_board()  # Plot the cells
+        game.draw_selection()
+
+        # Event handling
+        events = pending + pygame.event.get()
+        if events:
+            last_input = time.perf_counter()
+        motions = []  # positions of the mouse during the frame, joined into strokes
+        for event in events:
+            if event.type == pygame.MOUSEMOTION:
+                if game.selecting:
+                    game.drag_selection(event.pos)
+                else:
+                    motions.append((event.pos, game.stroke_buttons(event.buttons)))
+            if event.type == pygame.QUIT:  # Close the game by clicking the 'x' button
+                game.running = False
+            if event.type == pygame.VIDEORESIZE:
+                game.resize(*event.size)
+                ui, census_lines = layout_ui(game)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_s:
+                    game.Menu['Screenshot'][1] = True  # Call the state_screenshot function from the Menu dictionary
+                if event.key == pygame.K_ESCAPE:  # Press 'esc' to exit the game
+                    if not game.Menu['Exit'][1]:
+                        game.Menu['Exit'][1] = True  # Call the exit function from the Menu dictionary
+                    else:
+                        game.Menu['Exit'][1] = False
+                if event.key == pygame.K_p:
+                    game.change_state('Play / Pause', game.Menu)
+                if event.key == pygame.K_r:
+                    game.rotate_pattern()
+                if event.key == pygame.K_f:
+                    game.mirror_pattern()
+                if event.key == pygame.K_h:
+                    game.cycle_heatmap()
+                if event.key in (pygame.K_F9, pygame.K_F10):  # Start or stop a profiling window, or switch its mode
+                    if profiler is None:
+                        from frame_profiler import FrameProfiler  # imported lazily, only needed for profiling
+
+                        profiler = FrameProfiler()
+                    profiler.toggle('cprofile' if event.key == pygame.K_F9 else 'sampling')
+                if event.key == pygame.K_c and not event.mod & pygame.KMOD_CTRL:
+                    show_census = not show_census
+                    census_generation = None
+                if event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+                    game.undo()
+                if event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+                    game.redo()
+                # Selection tools
+                if game.selection is not None:
+                    if event.key == pygame.K_a:
+                        game.edit_region('fill')
+                    if event.key in (pygame.K_DELETE, pygame.K_BACKSPACE):
+                        game.edit_region('clear')
+                    if event.key == pygame.K_i:
+                        game.edit_region('invert')
+                    if event.key == pygame.K_n:
+                        game.edit_region('random')
+                    if event.key == pygame.K_MINUS:
+                        game.change_density(-0.05)
+                    if event.key == pygame.K_EQUALS:
+                        game.change_density(0.05)
+                    if event.key == pygame.K_c and event.mod & pygame.KMOD_CTRL:
+                        game.copy_selection()
+                    if event.key == pygame.K_x and event.mod & pygame.KMOD_CTRL:
+                        game.cut_selection()
+                if event.key == pygame.K_v and event.mod & pygame.KMOD_CTRL:
+                    game.paste()
+                if event.key == pygame.K_e and event.mod & pygame.KMOD_CTRL:
+                    game.export_clipboard()
+                if event.key == pygame.K_LEFTBRACKET:
+                    game.change_brush(-2)
+                if event.key == pygame.K_RIGHTBRACKET:
+                    game.change_brush(2)
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button in (1, 3) and (game.pasting or pygame.key.get_mods() & pygame.KMOD_SHIFT):
+                    game.no_stroke[event.button - 1] = True  # the click pastes or selects, it does not paint
+                if pygame.key.get_mods() & pygame.KMOD_SHIFT:  # Shift + LMB selects, Shift + RMB deselects
+                    if event.button == 1:
+                        game.start_selection(event.pos)
+                    if event.button == 3:
+                        game.selection = None
+                    continue
+                if event.button in (1, 3) and not game.no_stroke[event.button - 1]:
+                    # a click without a motion is a stroke of a single cell
+                    motions.append((event.pos, (event.button == 1, False, event.button == 3)))
+                if event.button == 1:
+                    game.LMB = True
+                if event.button == 3:
+                    game.RMB = True
+            if event.type == pygame.MOUSEBUTTONUP and event.button in (1, 3):
+                game.no_stroke[event.button - 1] = False
+                if event.button == 1:
+                    game.selecting = False
+        game.mouse_click(motions)  # Bring cells to life or kill them by clicking or dragging the mouse
+
+        ## Menu ##
+        pos = pygame.mouse.get_pos()
+        ui.hover(pos)  # only the buttons the mouse left or entered change
+        ui.draw(screen)  # Draw the title, the buttons and the prompts
 
-        if menu_button.is_clicked(game.Menu[key][0], game.LMB) and not any(
+        # Check if a button is clicked and no other button was clicked (except Play / Pause)
+        clicked = ui.widget_at(pos) if game.LMB else None
+        if clicked is not None and clicked.name is not None and not any(
                 game.Menu[entry][1] for entry in game.Menu.keys()
-                if entry != key and entry != 'Play / Pause' and key != 'Exit'):
-            game.change_state(key, game.Menu)
-
-    # update the board
-    if not game.Menu['Play / Pause'][1]:
-        game.update()  # Update the board
-
-    # menu functions
-    game.draw_pattern()
-    game.clear()
-    game.restart()
-
-    # Display the prompts
-    for i, prompt in enumerate(prompts_list):  # Loop through the list of prompts
-        prompts.draw_text_box(screen, prompt, (zero_x + length) + 10, HEIGHT // 2 + prompts.font_size * 2 * i,
-                              align='bottomleft', frame_width=-1)  # Draw the prompts
-    game.paused()
-    game.exit_diag()  # Display the dialog box to confirm if the user wants to exit the game
-    game.cursor()  # Draw a red rectangle around the cell the cursor is currently on
-    game.take_screenshot()  # Take a screenshot if the state is True (i.e. if the 'Screenshot' button is clicked)
-
-    pygame.display.flip()  # Update the display
-    clock.tick(144)  # Set the frame rate to 144
-
-print('game exited normally')
-pygame.quit()  # Quit the game
-
-sys.exit()
+                if entry != clicked.name and entry != 'Play / Pause' and clicked.name != 'Exit'):
+            game.change_state(clicked.name, game.Menu)
+
+        # pause or resume updating the board
+        worker.paused = game.Menu['Play / Pause'][1]
+
+        # menu functions
+        game.draw_pattern()
+        game.draw_paste()
+        game.clear()
+        game.restart()
+
+        # Display the object census, recomputed every 10 generations
+        if show_census:
+            if recogniser is None:
+                from object_recogniser import ObjectRecogniser  # imported lazily, only needed for the census
+
+                recogniser = ObjectRecogniser()
+            if census_generation is None or worker.generation - census_generation >= 10:
+                census, census_generation = recogniser.census(game.board), worker.generation
+            lines = ['Objects on the board:'] + [f'{name}: {count}' for name, count in list(census.items())[:8]]
+            for widget, line in zip(census_lines, lines):
+                widget.set_text(line)  # only rendered again if the line changed
+                widget.draw(screen)
+        game.paused()
+        game.exit_diag()  # Display the dialog box to confirm if the user wants to exit the game
+        game.cursor()  # Draw a red rectangle around the cell the cursor is currently on
+        game.take_screenshot()  # Take a screenshot if the state is True (i.e. if the 'Screenshot' button is clicked)
+
+        pygame.display.flip()  # Update the display
+        if first_frame:
+            print(f'Cold start to first frame: {time.perf_counter() - _start_time:.3f} s')
+            first_frame = False
+        timeout = game.frame_timeout(last_input)
+        if timeout:
+            # Nothing is animating: sleep until an input arrives or the next frame is due
+            event = pygame.event.wait(timeout)
+            pending = [event] if event.type != pygame.NOEVENT else []
+            clock.tick()
+        else:
+            pending = []
+            clock.tick(144)  # Set the frame rate to 144
+
+    if profiler is not None:
+        profiler.stop()  # save the profile of a window which is still active
+    worker.stop()
+    if game.recorder is not None:
+        game.recorder.close(worker.generation, worker.latest())
+        print(f'session recorded to {args.record}')
+    if worker.archive is not None:
+        worker.archive.close()
+        print(f'run archived to {args.archive}')
+    print('game exited normally')
+    pygame.quit()  # Quit the game
+
+    sys.exit()
+
+
+if __name__ == '__main__':
+    main()
@@ -31,6 +31,7 @@ class Objects:
                   'GREEN': (0, 255, 0),
                   'BLUE': (0, 0, 255),
                   'GRAY': (200, 200, 200),
+                  'YELLOW': (255, 255, 0),
                   'WHITE': (255, 255, 255)}
 
         self.font_size = 30 if font_size is None else font_size  # Default font size
@@ -171,6 +172,162 @@ class Objects:
         screen_border = pygame.Rect(0, 0, width, height)  # Create a rectangle object of the screen
         return pygame.Rect.contains(screen_border, rectangle_object)  # Check if the rectangle is inside the screen
 
+class Widget:
+    def __init__(self, style, text, x, y, align=None, frame_width=3, name=None):
+        """
+        Class for a text box which is rendered once and then only blitted (retained mode), see WidgetTree
+        Args:
+            style (Objects): the text box object providing the font, the colors and the frame inflation
+            text (str): the text to be displayed
+            x (int): the x coordinate of the text box
+            y (int): the y coordinate of the text box
+            align (None or str): the alignment of the text box, as in Objects.draw_text_box
+            frame_width (int): the width of the text box frame; set to -1 to remove the frame, set to 0 to fill the text box
+            name (None or str): the name reported when the widget is clicked, e.g. the key in the Menu dictionary
+        Attributes:
+            frame (pygame.Rect): the rectangle object of the text box
+            hovered (bool): True if the mouse is over the text box
+        """
+        self.style = style
+        self.x, self.y = x, y
+        self.align = align
+        self.frame_width = frame_width
+        self.name = name
+        self.hovered = False
+        self.text = None
+        self.set_text(text)
+
+    def set_text(self, text):
+        """
+        Function to change the text of the widget; it is only rendered again if the text changed.
+        Args:
+            text (str): the text to be displayed
+        """
+        if text == self.text:
+            return
+        self.text = text
+        rendered = self.style.font.render(text, True, self.style.text_color)  # Render the text
+        text_box = rendered.get_rect(center=(self.x, self.y))  # Get the rectangle object of the text
+
+        # Alignment the text box (same as in Objects.draw_text_box)
+        if self.align == 'bottomleft':
+            text_box.bottomleft = self.x, self.y
+        if self.align == 'bottomright':
+            text_box.bottomright = self.x, self.y
+        if self.align == 'midbottom':
+            text_box.midbottom = self.x, self.y
+
+        self.frame = text_box.inflate(self.style.inf_coeff, self.style.inf_coeff)  # Create the text box frame
+        self.frame.center = text_box.center  # Center the text box frame
+
+        # Render the text box once with the normal frame and once with the hover frame
+        self._surfaces = {}
+        for hovered, color in ((False, self.style.obj_color), (True, RED)):
+            surface = pygame.Surface(self.frame.size, pygame.SRCALPHA)
+            pygame.draw.rect(surface, color, surface.get_rect(), self.frame_width)  # Draw the text box frame
+            surface.blit(rendered, (text_box.x - self.frame.x, text_box.y - self.frame.y))  # Display the text
+            self._surfaces[hovered] = surface
+
+    def draw(self, screen):
+        """
+        Function to draw the widget.
+        Args:
+            screen (pygame.Surface): the screen object
+        """
+        screen.blit(self._surfaces[self.hovered], self.frame)
+
+
+class WidgetTree:
+    def __init__(self, grid_size=64):
+        """
+        Class holding the widgets of a screen. The layout is computed once (and again when the window is resized)
+        and the widgets are indexed in a grid, so the widget under the mouse is found without scanning all of them.
+        Args:
+            grid_size (int): the size of the grid cells of the index in pixels
+        Attributes:
+            widgets (list): the widgets in drawing order
+            hovered (None or Widget): the widget under the mouse
+            outside (bool): True if some widget does not fit inside the screen
+        """
+        self.grid_size = grid_size
+        self.widgets = []
+        self.hovered = None
+        self.outside = False
+        self._grid = {}
+        self._warning = None
+
+    def add(self, widget):
+        """
+        Function to add a widget; layout() must be called once all widgets are added.
+        Args:
+            widget (Widget): the widget to be added
+        Returns:
+            widget (Widget): the same widget
+        """
+        self.widgets.append(widget)
+        return widget
+
+    def layout(self, size):
+        """
+        Function to index the widgets and check that they fit inside the screen.
+        Args:
+            size (tuple): the size of the screen
+        """
+        screen_border = pygame.Rect(0, 0, size[0], size[1])  # Create a rectangle object of the screen
+        self.outside = not all(screen_border.contains(widget.frame) for widget in self.widgets)
+        self._grid = {}
+        for widget in self.widgets:
+            frame = widget.frame
+            for gx in range(frame.left // self.grid_size, (frame.right - 1) // self.grid_size + 1):
+                for gy in range(frame.top // self.grid_size, (frame.bottom - 1) // self.grid_size + 1):
+                    self._grid.setdefault((gx, gy), []).append(widget)
+
+    def widget_at(self, pos):
+        """
+        Function to find the widget at the given position.
+        Args:
+            pos (tuple): the position, e.g. of the mouse
+        Returns:
+            widget (None or Widget): the topmost widget at the position, None if there is none
+        """
+        for widget in reversed(self._grid.get((pos[0] // self.grid_size, pos[1] // self.grid_size), ())):
+            if widget.frame.collidepoint(pos):
+                return widget
+        return None
+
+    def hover(self, pos):
+        """
+        Function to update the hover state; only the widgets the mouse left or entered change.
+        Args:
+            pos (tuple): the position of the mouse
+        """
+        widget = self.widget_at(pos)
+        if widget is not self.hovered:
+            if self.hovered is not None:
+                self.hovered.hovered = False
+            if widget is not None:
+                widget.hovered = True
+            self.hovered = widget
+
+    def draw(self, screen):
+        """
+        Function to draw all widgets. If some widget does not fit inside the screen a warning is displayed instead.
+        Args:
+            screen (pygame.Surface): the screen object
+        """
+        for widget in self.widgets:
+            widget.draw(screen)
+
+        if self.outside:
+            if self._warning is None:
+                self._warning = Objects(text_color='BLACK')
+            OK = self._warning.dialog_box(screen,
+                                          'Some text objects are outside the screen. Try setting lower font or higher resolution',
+                                          num_options=1)  # Display a warning dialog box
+            if self._warning.is_clicked(OK, pygame.mouse.get_pressed()[0]):  # Check if the OK button is clicked
+                sys.exit()  # Exit the program
+
+
 # welcome screen
 def welcome_screen():
     pygame.init()
@@ -181,20 +338,21 @@ def welcome_screen():
     full_screen=False
 
     #background = BLACK
+    header = Objects(text_color='WHITE', font_size=36)
+    prompt = Objects(text_color ='WHITE', font_size=30, obj_color='WHITE')
 
+    waited = []  # event which woke the loop up
     while welcome:
         LMB = False
-        for event in pygame.event.get():
+        for event in waited + pygame.event.get():
             if event.type == pygame.QUIT:
                 sys.exit()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
                     LMB = True
         welcome_screen.fill(BLACK)
-        header = Objects(text_color='WHITE', font_size=36)
         header.draw_text_box(welcome_screen,"Welcome to the Conway's", x=300,y=50, align='center')
         header.draw_text_box(welcome_screen, "Game of Life", x = 300, y = 100, align = 'center')
-        prompt = Objects(text_color ='WHITE', font_size=30, obj_color='WHITE')
         prompt.draw_text_box(welcome_screen, 'Enable full screen?', x = 300, y = 250, frame_width=-1)
         yes = prompt.draw_text_box(welcome_screen, 'YES',x =200 ,y = 350, frame_width=3)
         no = prompt.draw_text_box(welcome_screen, ' NO ',x =400 ,y = 350, frame_width=3)
@@ -209,6 +367,8 @@ def welcome_screen():
             sys.exit()
 
         pygame.display.update()
+        # Nothing changes without input: block until the next event instead of redrawing in a busy loop
+        waited = [pygame.event.wait()]
 
     pygame.quit()
     return(full_screen)
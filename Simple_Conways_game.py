@@ -2,6 +2,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 
+import board_script
 import glider_gun_script
 """
 This is a simple implementation of the Conway's game of life.
@@ -58,28 +59,12 @@ elif option == 1:
 # Function to update the board state
 def update(frame):
     ax.clear()
-    # Compute counts
-    board[:,:,counts] = np.zeros((x,y),dtype=int)
-    for di in [-1,0,1]:
-        for dj in [-1,0,1]:
-            if di != 0 or dj != 0:
-                board[1:x-1,1:y-1,counts] += board[1+di:x-1+di,1+dj:y-1+dj,states]
+    # Compute counts and update states based on counts (in place, with the shared allocation-free kernel)
+    board_script.update_board(board)
     """
     for i in range(1, x - 1):
         for j in range(1, y - 1):
             board[i, j, counts] = np.sum(board[i - 1:i + 2, j - 1:j + 2, states]) - board[i, j, states]
-    # Update states based on counts
-    """
-
-
-    board[np.where(board[1:x-1,1:y-1,counts] > 3)[0]+1,np.where(board[1:x-1,1:y-1,counts] > 3)[1]+1,states] = 0
-
-    board[np.where(board[1:x-1,1:y-1,counts] < 2)[0]+1,np.where(board[1:x-1,1:y-1,counts] < 2)[1]+1,states] = 0
-
-    board[np.where(board[1:x-1,1:y-1,counts] == 3)[0]+1,np.where(board[1:x-1,1:y-1,counts] == 3)[1]+1,states] = 1
-
-
-    """
     for i in range(1, x - 1):
         for j in range(1, y - 1):
             if board[i, j, counts] == 3:
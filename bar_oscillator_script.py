@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 """
 This script is used to create a simple bar oscillator pattern for the Conway's game of life.
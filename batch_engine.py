@@ -0,0 +1,189 @@
+import argparse
+import time
+
+import numpy as np
+
+import board_script
+
+"""
+This script advances many independent boards of the Conway's game of life at once.
+The boards are stacked along a leading axis into a single array of shape (K, x, y) holding only the states, and every
+generation of all boards is computed with one set of vectorised numpy operations instead of one call of Game.update
+per board. This makes sweeps of initial densities or random seeds much faster, as the numpy overhead per call is shared
+by all boards.
+The same rules and boundary condition as in board_script.update_board are used: only the inner cells are updated, the
+cells on the edges keep their initial state.
+Every board has its own generation counter. A board is retired as soon as it has stabilised, i.e. when it repeats with
+a period up to max_period, or when it reached the maximal number of generations. Retired boards are moved out of the
+working stack, so the remaining boards are computed without them.
+Usage example (sweep of densities, 50 seeds each):
+    python batch_engine.py --densities 0.1 0.2 0.3 0.4 0.5 --seeds 50
+"""
+
+states = 0
+
+
+class BatchEngine:
+    def __init__(self, boards, max_generations=5000, max_period=2):
+        """
+        Class to run a batch of boards in a single vectorised kernel
+        Args:
+            boards (numpy.ndarray or list): the boards, either states of shape (K, x, y) or full boards (K, x, y, 2)
+            max_generations (int): the maximal number of generations of a board
+            max_period (int): the longest period detected for retiring stabilised boards
+        Attributes:
+            boards (numpy.ndarray): the states of all boards, shape (K, x, y); a retired board holds its final state
+            generations (numpy.ndarray): the number of generations computed for each board
+            periods (numpy.ndarray): the period of each stabilised board, 0 if it did not stabilise (yet)
+            retired (numpy.ndarray): True for the boards which are not computed any more
+        """
+        boards = np.asarray(boards)
+        if boards.ndim == 4:
+            boards = boards[..., states]
+        self.boards = (boards != 0).astype(np.uint8)
+        self.max_generations = max_generations
+        self.max_period = max_period
+
+        k, x, y = self.boards.shape
+        self.generations = np.zeros(k, dtype=np.int64)
+        self.periods = np.zeros(k, dtype=np.int64)
+        self.retired = np.zeros(k, dtype=bool)
+
+        # Working stack: the first n boards of each buffer are the active ones, in the order given by _active.
+        # _history[0] is the current generation, _history[p] the generation p steps ago.
+        self._active = np.arange(k)
+        self._history = [self.boards.copy() for _ in range(max_period + 1)]
+        self._spare = self.boards.copy()
+        self._counts = np.zeros((k, x - 2, y - 2), dtype=np.uint8)
+        self._steps = 0  # number of generations computed for the whole working stack
+
+    @property
+    def active(self):
+        """Number of boards which are still computed."""
+        return len(self._active)
+
+    def step(self):
+        """
+        Function to advance all active boards by one generation and retire the stabilised ones.
+        Returns:
+            active (int): the number of boards which are still active
+        """
+        n = len(self._active)
+        if n == 0:
+            return 0
+        x, y = self.boards.shape[1], self.boards.shape[2]
+        current = self._history[0][:n]
+        counts = self._counts[:n]
+
+        # Count the neighbours of all boards at once
+        counts[...] = 0
+        for di in [-1, 0, 1]:
+            for dj in [-1, 0, 1]:
+                if di != 0 or dj != 0:
+                    np.add(counts, current[:, 1 + di:x - 1 + di, 1 + dj:y - 1 + dj], out=counts)
+
+        # Apply the rules into the spare buffer: born with 3 neighbours, survive with 2 or 3 neighbours
+        spare = self._spare
+        inner = spare[:n, 1:x - 1, 1:y - 1]
+        np.logical_or(counts == 3, (counts == 2) & current[:, 1:x - 1, 1:y - 1].view(bool), out=inner.view(bool))
+
+        # The new generation becomes the current one and the oldest generation becomes the spare buffer
+        self._spare = self._history[-1]
+        self._history = [spare] + self._history[:-1]
+        self._steps += 1
+        self.generations[self._active] += 1
+
+        # Retire the boards which repeat with a period up to max_period or reached the maximal number of generations
+        nxt = self._history[0][:n]
+        periods = np.zeros(n, dtype=np.int64)
+        for period in range(self.max_period, 0, -1):
+            if self._steps >= period:
+                same = ~(nxt != self._history[period][:n]).any(axis=(1, 2))
+                periods[same] = period
+        retire = (periods > 0) | (self.generations[self._active] >= self.max_generations)
+        if retire.any():
+            self._retire(retire, periods)
+        return len(self._active)
+
+    def _retire(self, retire, periods):
+        """
+        Function to move the retired boards out of the working stack.
+        Args:
+            retire (numpy.ndarray): True for the active boards to be retired
+            periods (numpy.ndarray): the detected period of each active board, 0 if none
+        """
+        n = len(self._active)
+        done = self._active[retire]
+        self.boards[done] = self._history[0][:n][retire]
+        self.periods[done] = periods[retire]
+        self.retired[done] = True
+
+        keep = ~retire
+        m = int(keep.sum())
+        for buffer in self._history + [self._spare]:  # the spare buffer too: it provides the edges of the next step
+            buffer[:m] = buffer[:n][keep]
+        self._active = self._active[keep]
+
+    def run(self):
+        """
+        Function to run all boards until every board is retired.
+        Returns:
+            boards (numpy.ndarray): the final states of all boards
+        """
+        while self.step():
+            pass
+        return self.boards
+
+
+def sweep(densities, seeds, size=100, max_generations=5000, max_period=2):
+    """
+    Function to run a sweep of random boards for several densities and seeds in one batch.
+    Args:
+        densities (list): the proportions of living cells
+        seeds (list): the seeds of the random boards, used for every density
+        size (int): the width and height of the boards
+        max_generations (int): the maximal number of generations of a board
+        max_period (int): the longest period detected for retiring stabilised boards
+    Returns:
+        results (list): one dictionary per board with the density, seed, generations, period and final population
+    """
+    runs = [(density, seed) for density in densities for seed in seeds]
+    boards = np.stack([board_script.create_board(size, size, density, np.random.default_rng(seed))[:, :, states]
+                       for density, seed in runs])
+    engine = BatchEngine(boards, max_generations, max_period)
+    engine.run()
+    populations = engine.boards.sum(axis=(1, 2))
+    return [{'density': density, 'seed': seed, 'generations': int(engine.generations[i]),
+             'period': int(engine.periods[i]), 'population': int(populations[i])}
+            for i, (density, seed) in enumerate(runs)]
+
+
+def main(argv=None):
+    """
+    Run a sweep from the command line and print the results per density.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    parser = argparse.ArgumentParser(description="Batched sweep of random boards for the Conway's game of life")
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.2], help='proportions of living cells')
+    parser.add_argument('--seeds', type=int, default=100, help='number of seeds per density')
+    parser.add_argument('--size', type=int, default=100, help='width and height of the boards')
+    parser.add_argument('--max-generations', type=int, default=5000, help='maximal number of generations')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = sweep(args.densities, range(args.seeds), args.size, args.max_generations)
+    duration = time.perf_counter() - start
+    total = sum(result['generations'] for result in results)
+    print(f'{len(results)} boards, {total} board generations in {duration:.2f} s '
+          f'({total / duration:.0f} board generations per second)')
+    for density in args.densities:
+        group = [result for result in results if result['density'] == density]
+        stable = [result for result in group if result['period'] > 0]
+        print(f'density {density}: {len(stable)}/{len(group)} stabilised, '
+              f'mean lifetime {np.mean([result["generations"] for result in group]):.1f}, '
+              f'mean final population {np.mean([result["population"] for result in group]):.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,7 @@
+import importlib
+import re
+import threading
+
 import numpy as np
 """
 This script is used to create a random board for the Conway's game of life.
@@ -6,29 +10,292 @@ and the third dimension stores the current state and the neighbours count. The s
 neighbours count is stored in the second layer. The state of a cell can be either 0 (dead) or 1 (alive). The neighbours
 count is an integer that represents the number of alive cells around a given cell.
 The board is initialized with random values, with 80% of the cells being dead and 20% being alive. This proportion can be
-changed by modifying the p parameter in the np.random.choice function. The cells on the edges of the board are initialized
+changed with the density parameter of create_board. The cells on the edges of the board are initialized
 as dead. 
 The cells on the edges of the board are initialized as dead. The function create_board receives two parameters, x and y,
 which represent the size of the board. Size is determined in the main program given the screen resolution.
 The function returns the initialized board and is used in the main program to create the initial state of the game.
+The function update_board advances a board by one generation in place and is shared by the interactive game and
+the headless tools.
 """
 
-def create_board(x,y):
+_scratch = threading.local()  # scratch buffers of update_board, per thread and board size
+
+
+def create_board(x, y, density=0.2, rng=None):
     """
     Function to create a random board for the Conway's game of life.
     Args:
         x (int): the width of the board
         y (int): the height of the board
+        density (float): the proportion of living cells. Default is 0.2
+        rng (None or numpy.random.Generator): the random generator to be used, e.g. np.random.default_rng(seed) for
+            a reproducible board. Default is the global numpy random state
     Returns:
         board (numpy.ndarray): the initialized board
     """
 
-    states = 0
-    counts = 1
     board = np.zeros((x, y, 2), dtype=int)
-    board[:,:,states] = np.random.choice([0, 1], size=(x, y), p=[0.8, 0.2])
+    return fill_board(board, density, rng)
+
+
+def fill_board(board, density=0.2, rng=None):
+    """
+    Function to fill an existing board with random cells in place, the cells on the edges are set to dead.
+    Args:
+        board (numpy.ndarray): the board to be filled, shape (x, y, 2)
+        density (float): the proportion of living cells. Default is 0.2
+        rng (None or numpy.random.Generator): the random generator to be used. Default is the global numpy random state
+    Returns:
+        board (numpy.ndarray): the same board, filled
+    """
+
+    states = 0
+    x, y = board.shape[0], board.shape[1]
+    rng = np.random if rng is None else rng
+    board[:,:,states] = rng.choice([0, 1], size=(x, y), p=[1 - density, density])
     board[0,:,states] = 0
     board[x-1,:,states] = 0
     board[:,0,states] = 0
     board[:,y-1,states] = 0
-    return board
\ No newline at end of file
+    return board
+
+def _scratch_buffers(x, y):
+    """
+    Function to get the scratch buffers of update_board for a board size, allocated on the first call only.
+    The buffers are kept per thread, so boards can be updated in several threads at the same time.
+    Args:
+        x (int): the width of the board
+        y (int): the height of the board
+    Returns:
+        buffers (dict): flat arrays of all cells, uint8 'cells' and 'counts' and boolean 'born' and 'survive', and
+            arrays of shape (x, y), boolean 'alive', 'previous' and 'mask' and uint8 'bytes'
+    """
+    cache = _scratch.__dict__.setdefault('buffers', {})
+    if (x, y) not in cache:
+        if len(cache) >= 8:
+            cache.clear()  # e.g. many board sizes in a single thread; keeps the memory bounded
+        cache[(x, y)] = {'cells': np.empty(x * y, dtype=np.uint8),
+                         'counts': np.empty(x * y, dtype=np.uint8),
+                         'born': np.empty(x * y, dtype=bool),
+                         'survive': np.empty(x * y, dtype=bool),
+                         'alive': np.empty((x, y), dtype=bool),
+                         'previous': np.empty((x, y), dtype=bool),
+                         'mask': np.empty((x, y), dtype=bool),
+                         'bytes': np.empty((x, y), dtype=np.uint8)}
+    return cache[(x, y)]
+
+
+def update_board(board, ages=None, activity=None):
+    """
+    Function to advance the board by one generation of the Conway's game of life.
+    The neighbours count layer is recomputed first and the state layer is then updated in place.
+    Optionally the age and the activity of the cells are updated in the same pass, e.g. for heatmaps.
+    All intermediate results are written into scratch buffers which are allocated once per board size, so a generation
+    allocates no arrays (only a few small views). The states are copied into a contiguous flat buffer, where the
+    neighbours of the inner cells are contiguous slices shifted by -y-1 ... y+1, so numpy never needs to buffer them.
+    Args:
+        board (numpy.ndarray): the board to be updated, shape (x, y, 2)
+        ages (None or numpy.ndarray): the number of generations each cell has been alive, unsigned integers of shape
+            (x, y), e.g. uint16; saturates at the largest value of its dtype
+        activity (None or numpy.ndarray): decaying count of the state changes of each cell, uint8 of shape (x, y);
+            every change adds 64 and every generation removes an eighth
+    Returns:
+        board (numpy.ndarray): the same board, updated
+    """
+
+    states = 0
+    counts = 1
+    x, y = board.shape[0], board.shape[1]
+    if x < 3 or y < 3:  # no inner cells, the edge cells are never updated
+        board[:, :, counts] = 0
+        return board
+    scratch = _scratch_buffers(x, y)
+    cells, neighbours, born, survive = scratch['cells'], scratch['counts'], scratch['born'], scratch['survive']
+    np.copyto(cells.reshape(x, y), board[:, :, states], casting='unsafe')
+    if activity is not None:
+        np.not_equal(cells.reshape(x, y), 0, out=scratch['previous'])
+
+    # Count the neighbours of the flat range from the first to the last inner cell (the values computed for the edge
+    # cells within this range are meaningless and never copied back)
+    first, n = y + 1, x * y - 2 * y - 2
+    neighbours.fill(0)
+    inner = neighbours[first:first + n]
+    for di in [-1, 0, 1]:
+        for dj in [-1, 0, 1]:
+            if di != 0 or dj != 0:
+                shift = first + di * y + dj
+                np.add(inner, cells[shift:shift + n], out=inner)
+
+    # Update states based on number of neighbours: born with 3 neighbours, survive with 2 or 3 neighbours
+    np.equal(neighbours, 3, out=born)
+    np.equal(neighbours, 2, out=survive)
+    np.logical_and(survive, cells, out=survive)
+    np.logical_or(born, survive, out=born)
+    board[:, :, counts] = 0
+    np.copyto(board[1:x - 1, 1:y - 1, counts], neighbours.reshape(x, y)[1:x - 1, 1:y - 1])
+    np.copyto(board[1:x - 1, 1:y - 1, states], born.reshape(x, y)[1:x - 1, 1:y - 1])
+
+    # Update the optional age and activity layers
+    if ages is not None or activity is not None:
+        np.copyto(cells.reshape(x, y)[1:x - 1, 1:y - 1], born.reshape(x, y)[1:x - 1, 1:y - 1])
+        alive = np.not_equal(cells.reshape(x, y), 0, out=scratch['alive'])
+    if ages is not None:
+        older = np.less(ages, np.iinfo(ages.dtype).max, out=scratch['mask'])  # unless saturated
+        np.add(ages, older, out=ages)  # one generation older
+        np.multiply(ages, alive, out=ages)  # dead cells have no age
+    if activity is not None:
+        changed = np.not_equal(alive, scratch['previous'], out=scratch['mask'])
+        step = scratch['bytes']
+        np.right_shift(activity, 3, out=step)
+        np.subtract(activity, step, out=activity)  # decay
+        np.minimum(activity, 255 - 64, out=activity, where=changed)  # saturate instead of overflowing
+        np.left_shift(changed.view(np.uint8), 6, out=step)
+        np.add(activity, step, out=activity)  # every change adds 64
+    return board
+
+
+def stroke_cells(points, brush=1, shape=None):
+    """
+    Function to rasterise a stroke of the mouse: the cells on the straight lines between consecutive points, widened by
+    a round brush. The lines of all segments are computed at once, without a loop over the cells.
+    Args:
+        points (list or numpy.ndarray): the (x, y) cells the mouse went through, at least one
+        brush (int): the diameter of the brush in cells, 1 for single cells
+        shape (None or tuple): the (x, y) size of the board; the cells outside of the board are dropped
+    Returns:
+        xs (numpy.ndarray): the x coordinates of the cells of the stroke, every cell once
+        ys (numpy.ndarray): the y coordinates of the cells of the stroke
+    """
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    start, delta = points[:-1], np.diff(points, axis=0)
+    steps = np.abs(delta).max(axis=1)
+
+    # One cell per step of every segment (the position t along its segment), then the last point
+    segment = np.repeat(np.arange(len(steps)), steps)
+    t = np.arange(len(segment)) - np.repeat(np.cumsum(steps) - steps, steps)
+    line = start[segment] + np.rint(delta[segment] * (t / steps[segment])[:, None]).astype(np.int64)
+    line = np.concatenate([line, points[-1:]])
+
+    # Widen the line by the offsets of the cells within the brush
+    radius = brush // 2
+    offsets = np.stack(np.meshgrid(np.arange(-radius, radius + 1), np.arange(-radius, radius + 1)), -1).reshape(-1, 2)
+    offsets = offsets[(offsets ** 2).sum(axis=1) <= radius * (radius + 1)]
+    cells = (line[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+
+    if shape is not None:
+        cells = cells[(cells >= 0).all(axis=1) & (cells[:, 0] < shape[0]) & (cells[:, 1] < shape[1])]
+    if len(cells) == 0:
+        return cells[:, 0], cells[:, 1]
+
+    # Every cell once: unique flat indices of the cells within their bounding box
+    low = cells.min(axis=0)
+    width = cells[:, 1].max() - low[1] + 1
+    flat = np.unique((cells[:, 0] - low[0]) * width + cells[:, 1] - low[1])
+    return flat // width + low[0], flat % width + low[1]
+
+
+def pattern_from_str(pattern_str):
+    """
+    Function to convert a pattern string of dots and O's to a numpy array.
+    Args:
+        pattern_str (str): the pattern string
+    Returns:
+        pattern_array (numpy.ndarray): the pattern as a numpy array
+    """
+    # Split the pattern string into lines and remove empty lines
+    pattern_lines = pattern_str.strip().split('\n')
+    for i in range(len(pattern_lines)):
+        pattern_lines[i] = pattern_lines[i].strip()  # Remove leading and trailing whitespaces in each line
+    # Determine the size of the pattern
+    rows = len(pattern_lines)
+    cols = len(pattern_lines[0])
+
+    # Create a numpy array to store the pattern
+    pattern_array = np.zeros((rows, cols), dtype=int)
+
+    # Convert the pattern string to a numpy array
+    for i, line in enumerate(pattern_lines):  # Loop through the pattern lines
+        for j, char in enumerate(line):  # Loop through the characters in the line
+            if char == 'O':  # Check if the character is 'O'
+                pattern_array[i, j] = 1  # Set the corresponding element in the numpy array to 1
+
+    return np.rot90(pattern_array)
+
+
+def load_pattern(script_name):
+    """
+    Function to load the pattern of a pattern script (e.g. "pulsar_script") as a 2D array of states.
+    Args:
+        script_name (str): the name of the pattern script, which must contain the function create_pattern()
+    Returns:
+        pattern (numpy.ndarray): the pattern as a 2D numpy array
+    """
+    pattern = importlib.import_module(script_name).create_pattern()
+    if isinstance(pattern, str):
+        pattern = pattern_from_str(pattern)
+    pattern = np.asarray(pattern)
+    return pattern.reshape(pattern.shape[0], pattern.shape[1]).astype(int)
+
+
+def pattern_to_rle(cells):
+    """
+    Function to encode a pattern in the run length encoded (RLE) format used by Golly and the LifeWiki.
+    Args:
+        cells (numpy.ndarray): the pattern indexed [x, y] like the board (x to the right, y downwards), nonzero is alive
+    Returns:
+        rle (str): the pattern in RLE, with the header line and lines of at most 70 characters
+    """
+    cells = np.asarray(cells) != 0
+    width, height = cells.shape
+    tokens = []
+    empty_rows = 0  # rows ending since the last row with living cells, written as a single 'n$' token
+    for row in cells.T:  # the rows of the RLE go from top to bottom
+        if not row.any():
+            empty_rows += 1
+            continue
+        if tokens or empty_rows:
+            ends = empty_rows + (1 if tokens else 0)
+            tokens.append(f'{ends if ends > 1 else ""}$')
+        empty_rows = 0
+        # Runs of equal cells: their starts, lengths and states (the trailing dead cells are left out)
+        starts = np.concatenate([[0], np.flatnonzero(row[1:] != row[:-1]) + 1])
+        lengths = np.diff(np.concatenate([starts, [width]]))
+        alive = row[starts]
+        if not alive[-1]:
+            starts, lengths, alive = starts[:-1], lengths[:-1], alive[:-1]
+        tokens.extend(f'{n if n > 1 else ""}{"o" if a else "b"}' for n, a in zip(lengths, alive))
+    tokens.append('!')
+
+    lines = [f'x = {width}, y = {height}, rule = B3/S23', '']
+    for token in tokens:
+        if len(lines[-1]) + len(token) > 70:
+            lines.append('')
+        lines[-1] += token
+    return '\n'.join(lines) + '\n'
+
+
+def pattern_from_rle(rle):
+    """
+    Function to decode a pattern in the run length encoded (RLE) format, e.g. from pattern_to_rle or the LifeWiki.
+    Args:
+        rle (str): the pattern in RLE; comment lines starting with '#' are ignored
+    Returns:
+        pattern (numpy.ndarray): the pattern indexed [x, y] like the board (x to the right, y downwards)
+    """
+    lines = [line.strip() for line in rle.strip().split('\n') if not line.startswith('#')]
+    header = dict(item.split('=') for item in lines[0].replace(' ', '').split(','))
+    pattern = np.zeros((int(header['x']), int(header['y'])), dtype=int)
+
+    x, y = 0, 0
+    for count, tag in re.findall(r'(\d*)([a-zA-Z$!])', ''.join(lines[1:])):
+        count = int(count) if count else 1
+        if tag == '!':
+            break
+        if tag == '$':
+            x, y = 0, y + count
+        else:
+            if tag != 'b':  # any other cell state is alive
+                pattern[x:x + count, y] = 1
+            x += count
+    return pattern
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import socket
+import struct
+import zlib
+
+import numpy as np
+
+import board_script
+
+"""
+This script runs the Conway's game of life without a display and streams every generation to any number of viewers over
+a local TCP socket (or a Unix socket), so a long-running simulation can be watched from several desks.
+Each generation is sent as a compact message: a header (kind, generation, board size, payload length) followed by the
+zlib compressed, bit-packed cells. Keyframes hold the full board, deltas only the XOR of two consecutive generations,
+which is mostly zeros and therefore compresses very well.
+Every viewer has its own bounded queue of messages and a small write buffer (backpressure per client): the buffer of the
+connection and the send buffer of the socket are limited, so a slow viewer cannot pile up hundreds of messages outside
+of its queue. If a viewer is too slow (its queue is full or its write buffer is over the limit), its pending messages
+are dropped and it gets a keyframe of the current generation instead, so a slow viewer never stalls the simulation and
+is never more than a few messages behind. New viewers get a keyframe as soon as they connect and all viewers get a
+keyframe every keyframe_every generations.
+The viewer is a small pygame window which reconstructs the board from the messages; BoardClient can also be used without
+a display.
+Usage example (both on the same machine):
+    python board_server.py serve --port 5555 --size 200
+    python board_server.py view --port 5555
+"""
+
+HEADER = struct.Struct('!BQIII')  # kind, generation, x, y, payload length
+KEYFRAME, DELTA = 0, 1
+
+states = 0
+
+
+def encode(kind, generation, cells):
+    """
+    Function to encode a message.
+    Args:
+        kind (int): KEYFRAME or DELTA
+        generation (int): the generation of the board
+        cells (numpy.ndarray): the cells of the keyframe or the XOR of the delta, 2D uint8 array of 0 and 1
+    Returns:
+        message (bytes): the header followed by the compressed payload
+    """
+    payload = zlib.compress(np.packbits(cells).tobytes(), 1)
+    return HEADER.pack(kind, generation, cells.shape[0], cells.shape[1], len(payload)) + payload
+
+
+def decode(x, y, payload):
+    """
+    Function to decode the payload of a message.
+    Args:
+        x (int): the width of the board
+        y (int): the height of the board
+        payload (bytes): the compressed payload
+    Returns:
+        cells (numpy.ndarray): the cells, 2D uint8 array of 0 and 1
+    """
+    packed = np.frombuffer(zlib.decompress(payload), dtype=np.uint8)
+    return np.unpackbits(packed, count=x * y).reshape(x, y)
+
+
+class _Client:
+    def __init__(self, writer, queue_size, write_buffer):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.write_buffer = write_buffer
+        writer.transport.set_write_buffer_limits(high=write_buffer)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, write_buffer)  # the kernel buffer would hide the lag
+
+    def behind(self):
+        """
+        Function to check whether the viewer is too slow for the messages it was sent.
+        Returns:
+            True if its queue is full or its write buffer is over the limit
+        """
+        return self.queue.full() or self.writer.transport.get_write_buffer_size() > self.write_buffer
+
+
+class BoardServer:
+    def __init__(self, board, delay=0.1, keyframe_every=100, queue_size=8, write_buffer=4 * 1024):
+        """
+        Class to run the simulation and broadcast it to the connected viewers
+        Args:
+            board (numpy.ndarray): the initial board, shape (x, y, 2)
+            delay (float): the time between two generations in seconds
+            keyframe_every (int): the number of generations between two keyframes sent to all viewers
+            queue_size (int): the maximal number of messages waiting for a viewer
+            write_buffer (int): the maximal number of bytes buffered by the connection (and by the socket) of a viewer
+        Attributes:
+            generation (int): the current generation
+            clients (set): the connected viewers
+        """
+        self.board = board
+        self.delay = delay
+        self.keyframe_every = keyframe_every
+        self.queue_size = queue_size
+        self.write_buffer = write_buffer
+        self.generation = 0
+        self.clients = set()
+        self._published = (board[:, :, states] != 0).astype(np.uint8)  # cells of the last published generation
+        self._keyframe = None  # encoded keyframe of the last published generation, created when needed
+
+    def keyframe(self):
+        """
+        Function to get the keyframe of the last published generation.
+        Returns:
+            message (bytes): the encoded keyframe
+        """
+        if self._keyframe is None:
+            self._keyframe = encode(KEYFRAME, self.generation, self._published)
+        return self._keyframe
+
+    def publish(self):
+        """
+        Function to publish the current board to all viewers as a delta (or a keyframe where needed).
+        """
+        cells = (self.board[:, :, states] != 0).astype(np.uint8)
+        delta = encode(DELTA, self.generation, cells ^ self._published)
+        self._published, self._keyframe = cells, None
+        periodic = self.generation % self.keyframe_every == 0
+
+        for client in self.clients:
+            if client.behind():
+                # The viewer is too slow: drop its pending messages, it catches up with a keyframe
+                while not client.queue.empty():
+                    client.queue.get_nowait()
+                client.queue.put_nowait(self.keyframe())
+            else:
+                client.queue.put_nowait(self.keyframe() if periodic else delta)
+
+    async def handle_client(self, reader, writer):
+        """
+        Function to send the messages to a single viewer until it disconnects.
+        Args:
+            reader (asyncio.StreamReader): the reader of the connection (not used)
+            writer (asyncio.StreamWriter): the writer of the connection
+        """
+        client = _Client(writer, self.queue_size, self.write_buffer)
+        client.queue.put_nowait(self.keyframe())  # late viewers start from the current generation
+        self.clients.add(client)
+        print(f'viewer connected ({len(self.clients)} connected)')
+        try:
+            while True:
+                writer.write(await client.queue.get())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+            print(f'viewer disconnected ({len(self.clients)} connected)')
+
+    async def simulate(self, generations=None):
+        """
+        Function to run the simulation and publish every generation.
+        The generations are computed in a thread of the executor, so the connections are served meanwhile.
+        Args:
+            generations (None or int): the number of generations to run, endless if None
+        """
+        loop = asyncio.get_running_loop()
+        while generations is None or self.generation < generations:
+            await loop.run_in_executor(None, board_script.update_board, self.board)
+            self.generation += 1
+            self.publish()
+            await asyncio.sleep(self.delay)
+
+    async def serve(self, host='127.0.0.1', port=5555, unix=None, generations=None):
+        """
+        Function to start the server and run the simulation.
+        Args:
+            host (str): the address to listen on
+            port (int): the TCP port to listen on
+            unix (None or str): the path of a Unix socket to listen on instead of TCP
+            generations (None or int): the number of generations to run, endless if None
+        """
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.handle_client, unix)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        print(f'serving on {unix or f"{host}:{port}"}')
+        async with server:
+            await self.simulate(generations)
+
+
+class BoardClient:
+    def __init__(self, receive_buffer=4 * 1024):
+        """
+        Class to reconstruct the board from the messages of a BoardServer
+        Args:
+            receive_buffer (int): the maximal number of bytes buffered by the connection (and by the socket); a small
+                buffer lets the server notice when the client is behind
+        Attributes:
+            board (None or numpy.ndarray): the states of the board, 2D uint8 array; None until the first keyframe
+            generation (int): the generation of the board
+        """
+        self.board = None
+        self.generation = -1
+        self.receive_buffer = receive_buffer
+
+    async def connect(self, host='127.0.0.1', port=5555, unix=None):
+        """
+        Function to connect to a server.
+        Args:
+            host (str): the address of the server
+            port (int): the TCP port of the server
+            unix (None or str): the path of a Unix socket to connect to instead of TCP
+        """
+        # The receive buffer is limited before connecting, so the TCP window never grows beyond it
+        sock = socket.socket(socket.AF_UNIX if unix is not None else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, unix if unix is not None else (host, port))
+        connect = asyncio.open_unix_connection if unix is not None else asyncio.open_connection
+        self._reader, self._writer = await connect(sock=sock, limit=self.receive_buffer // 2)
+
+    async def receive(self):
+        """
+        Function to receive a single message and apply it to the board.
+        Returns:
+            kind (int): KEYFRAME or DELTA
+        """
+        kind, generation, x, y, length = HEADER.unpack(await self._reader.readexactly(HEADER.size))
+        cells = decode(x, y, await self._reader.readexactly(length))
+        if kind == KEYFRAME:
+            self.board = cells
+        elif self.board is not None:
+            self.board ^= cells
+        self.generation = generation
+        return kind
+
+    async def listen(self):
+        """
+        Function to apply the messages of the server until the connection is closed.
+        """
+        try:
+            while True:
+                await self.receive()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def close(self):
+        self._writer.close()
+
+
+async def view(host='127.0.0.1', port=5555, unix=None, size=(800, 800)):
+    """
+    Function to show the board of a server in a pygame window.
+    Args:
+        host (str): the address of the server
+        port (int): the TCP port of the server
+        unix (None or str): the path of a Unix socket to connect to instead of TCP
+        size (tuple): the size of the window
+    """
+    import pygame  # imported lazily, the server does not need a display
+
+    client = BoardClient()
+    await client.connect(host, port, unix)
+    listener = asyncio.create_task(client.listen())
+
+    pygame.display.init()
+    screen = pygame.display.set_mode(size)
+    running = True
+    while running and not listener.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+        if client.board is not None:
+            # White cells are alive and black cells are dead, the board is scaled to the window
+            cells = pygame.surfarray.make_surface(client.board * np.uint8(255))
+            cells.set_palette([(i, i, i) for i in range(256)])
+            screen.blit(pygame.transform.scale(cells, size), (0, 0))
+            pygame.display.set_caption(f"Conway's Game - generation {client.generation}")
+        pygame.display.flip()
+        await asyncio.sleep(1 / 60)  # let the client receive messages meanwhile
+
+    listener.cancel()
+    client.close()
+    pygame.quit()
+
+
+def main(argv=None):
+    """
+    Run the server or the viewer from the command line.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    parser = argparse.ArgumentParser(description="Stream the Conway's game of life to several viewers")
+    parser.add_argument('mode', choices=['serve', 'view'], help='run the simulation server or a viewer')
+    parser.add_argument('--host', default='127.0.0.1', help='address of the server')
+    parser.add_argument('--port', type=int, default=5555, help='TCP port of the server')
+    parser.add_argument('--unix', default=None, help='path of a Unix socket to use instead of TCP')
+    parser.add_argument('--size', type=int, default=100, help='width and height of the random board (serve)')
+    parser.add_argument('--delay', type=float, default=0.1, help='time between two generations in seconds (serve)')
+    parser.add_argument('--keyframe-every', type=int, default=100, help='generations between two keyframes (serve)')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.mode == 'serve':
+            server = BoardServer(board_script.create_board(args.size, args.size), args.delay, args.keyframe_every)
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        else:
+            asyncio.run(view(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import collections
+import zlib
+
+import numpy as np
+
+"""
+This script keeps the undo / redo journal of the edits of the board (mouse strokes, patterns, clear, restart and the
+selection tools).
+Every edit is recorded when it is applied, as compact as possible:
+- edits of single cells (strokes and patterns) as a sparse delta: the coordinates of the cells which actually changed
+  and their previous states, bit-packed (the new states are the opposite ones, the states being 0 or 1)
+- edits of regions (clear, restart, fill, ...) as one snapshot of the previous and of the new states of the region,
+  bit-packed and zlib compressed, unless only a few cells of the region changed (then as a sparse delta as well)
+Undo writes the previous states back to the changed cells and redo writes the new states again, so both take a time
+proportional to the number of changed cells (or to the size of a snapshot), whatever the size of the board.
+The journal is bounded in memory: the oldest edits are forgotten when the journal exceeds its memory budget.
+The edits of a single mouse stroke (one per frame) are grouped, so a whole stroke is undone at once.
+"""
+
+
+class _SparseEdit:
+    def __init__(self, xs, ys, old, shape):
+        """
+        Class holding the changed cells of an edit and their previous states
+        Args:
+            xs (numpy.ndarray): the x coordinates of the changed cells
+            ys (numpy.ndarray): the y coordinates of the changed cells
+            old (numpy.ndarray): the previous states of the changed cells (boolean)
+            shape (tuple): the shape of the state layer
+        """
+        dtype = np.uint16 if max(shape) <= np.iinfo(np.uint16).max else np.uint32
+        self.xs, self.ys = xs.astype(dtype), ys.astype(dtype)
+        self.count = len(old)
+        self.old = np.packbits(old)
+        self.nbytes = self.xs.nbytes + self.ys.nbytes + self.old.nbytes
+
+    def undo(self, states):
+        states[self.xs, self.ys] = np.unpackbits(self.old, count=self.count)
+
+    def redo(self, states):
+        states[self.xs, self.ys] = 1 - np.unpackbits(self.old, count=self.count)
+
+
+class _RegionEdit:
+    def __init__(self, index, old, new):
+        """
+        Class holding the compressed snapshot of a region before and after an edit
+        Args:
+            index (tuple): the slices of the region in the state layer
+            old (numpy.ndarray): the previous states of the region (boolean)
+            new (numpy.ndarray): the new states of the region (boolean)
+        """
+        self.index = index
+        self.shape = old.shape
+        self.old = zlib.compress(np.packbits(old).tobytes(), 1)
+        self.new = zlib.compress(np.packbits(new).tobytes(), 1)
+        self.nbytes = len(self.old) + len(self.new)
+
+    def _unpack(self, data):
+        packed = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+        return np.unpackbits(packed, count=int(np.prod(self.shape))).reshape(self.shape)
+
+    def undo(self, states):
+        states[self.index] = self._unpack(self.old)
+
+    def redo(self, states):
+        states[self.index] = self._unpack(self.new)
+
+
+class EditJournal:
+    def __init__(self, memory_budget=32 * 2 ** 20):
+        """
+        Class to record the edits of the board and to undo / redo them
+        Args:
+            memory_budget (int): the maximal size of the recorded edits in bytes
+        Attributes:
+            nbytes (int): the size of the recorded edits in bytes
+        """
+        self.memory_budget = memory_budget
+        self.nbytes = 0
+        self._undo = collections.deque()  # [group, parts] of the edits which can be undone, the newest last
+        self._redo = []  # [group, parts] of the undone edits, the most recently undone last
+
+    def __len__(self):
+        return len(self._undo)
+
+    def apply(self, states, index, value, group=None):
+        """
+        Function to write an edit into the state layer and record it.
+        Args:
+            states (numpy.ndarray): the state layer of the board, shape (x, y)
+            index (tuple): the index of the cells, either two slices or two (broadcastable) integer index arrays
+            value (int, numpy.ndarray or function): the new state(s) of the cells, 0 or 1, or a function computing them
+                from the current states of the cells, e.g. to invert a region
+            group (None or int): edits with the same group following each other are undone at once, e.g. the edits of a
+                mouse stroke
+        """
+        if callable(value):
+            value = value(states[index])
+        if all(isinstance(i, slice) for i in index):
+            # A region: compare its states before and after the edit
+            old = states[index] != 0
+            states[index] = value
+            new = states[index] != 0
+            changed = old != new
+            count = int(np.count_nonzero(changed))
+            if count * 32 < changed.size:
+                # only a few cells changed: the coordinates take less memory than a snapshot
+                local = np.nonzero(changed)
+                xs, ys = (np.arange(*i.indices(n))[l] for i, n, l in zip(index, states.shape, local))
+                part = _SparseEdit(xs, ys, old[changed], states.shape)
+            else:
+                part = _RegionEdit(index, old, new)
+        else:
+            # Single cells: every indexed cell once (a cell may be indexed several times, the last write wins)
+            states[index]  # raises an IndexError for cells outside of the board before anything is changed
+            xs, ys = (np.asarray(i) % n for i, n in zip(np.broadcast_arrays(*index), states.shape))
+            flat = np.unique(xs * states.shape[1] + ys)
+            xs, ys = flat // states.shape[1], flat % states.shape[1]
+            old = states[xs, ys] != 0
+            states[index] = value
+            changed = old != (states[xs, ys] != 0)
+            count = int(np.count_nonzero(changed))
+            part = _SparseEdit(xs[changed], ys[changed], old[changed], states.shape)
+        if count == 0:
+            return
+
+        self._forget(self._redo)
+        self._redo = []
+        if group is not None and self._undo and self._undo[-1][0] == group:
+            self._undo[-1][1].append(part)
+        else:
+            self._undo.append([group, [part]])
+        self.nbytes += part.nbytes
+        while self.nbytes > self.memory_budget and len(self._undo) > 1:
+            self._forget([self._undo.popleft()])  # the oldest edits are forgotten first
+
+    def undo(self, states):
+        """
+        Function to undo the most recent edit.
+        Args:
+            states (numpy.ndarray): the state layer of the board, shape (x, y)
+        Returns:
+            True if an edit was undone, False if there is nothing to undo
+        """
+        if not self._undo:
+            return False
+        entry = self._undo.pop()
+        for part in reversed(entry[1]):  # the earliest previous states are written last
+            part.undo(states)
+        self._redo.append(entry)
+        return True
+
+    def redo(self, states):
+        """
+        Function to redo the most recently undone edit.
+        Args:
+            states (numpy.ndarray): the state layer of the board, shape (x, y)
+        Returns:
+            True if an edit was redone, False if there is nothing to redo
+        """
+        if not self._redo:
+            return False
+        entry = self._redo.pop()
+        for part in entry[1]:
+            part.redo(states)
+        self._undo.append(entry)
+        return True
+
+    def _forget(self, entries):
+        for _, parts in entries:
+            self.nbytes -= sum(part.nbytes for part in parts)
+
+
+def apply_edit(states, index, value, event=None, journal=None):
+    """
+    Function to apply an edit of the state layer, recorded in the journal if any, or an undo / redo of the journal.
+    Args:
+        states (numpy.ndarray): the state layer of the board, shape (x, y)
+        index (None or tuple): the index of the cells (ignored for undo / redo)
+        value (None, int, numpy.ndarray or function): the new state(s) of the cells, or a function computing them from
+            the current states of the cells (ignored for undo / redo)
+        event (None or dict): the input event causing the edit; events of the type 'undo' or 'redo' undo or redo the
+            most recent edit, the key 'group' groups the edits of a mouse stroke
+        journal (None or EditJournal): the journal of the edits
+    Returns:
+        True if the edit was applied, False if there was nothing to undo / redo
+    """
+    kind = event.get('type') if event is not None else None
+    if kind in ('undo', 'redo'):
+        return journal is not None and getattr(journal, kind)(states)
+    if journal is not None:
+        journal.apply(states, index, value, event.get('group') if event is not None else None)
+    else:
+        states[index] = value(states[index]) if callable(value) else value
+    return True
@@ -0,0 +1,125 @@
+import cProfile
+import os
+import sys
+import threading
+from datetime import datetime
+
+"""
+This script profiles the interactive game on demand, e.g. when the frame rate collapses after placing several glider
+guns, without restarting it under cProfile.
+A profiling window is started and stopped with a hotkey of the game ('F9' for cProfile, 'F10' for sampling); the key of
+the other mode saves the active window and starts one in its own mode:
+- 'cprofile' mode records every call of the main thread with cProfile (deterministic, but slows the game down) and
+  writes a pstats file, which can be inspected with python -m pstats or snakeviz
+- 'sampling' mode starts a background thread which takes a snapshot of the stacks of all other threads (the main
+  thread and the simulation worker) every few milliseconds and writes a collapsed-stack file, one line per stack with
+  its number of samples, which can be turned into a flame graph, e.g. with flamegraph.pl or speedscope
+The files are named with the time the window was started, the same way as the screenshots, and saved next to them.
+While no window is active the profiler costs nothing but the check of the hotkey.
+"""
+
+
+class FrameProfiler:
+    def __init__(self, mode='cprofile', interval=0.005, directory='.'):
+        """
+        Class to profile a window of the game started and stopped on demand
+        Args:
+            mode (str): 'cprofile' for deterministic stats of the main thread or 'sampling' for sampled stacks of all
+                threads
+            interval (float): the time between two samples in seconds (sampling mode)
+            directory (str): the directory the profiles are saved to
+        """
+        if mode not in ('cprofile', 'sampling'):
+            raise ValueError(f'Unknown profiling mode: {mode}')
+        self.mode = mode
+        self.interval = interval
+        self.directory = directory
+        self._profile = None  # cProfile.Profile of the active window
+        self._sampler = None  # sampling thread of the active window
+        self._stop = threading.Event()
+        self._stacks = {}  # collapsed stack -> number of samples
+        self._started = None
+
+    @property
+    def active(self):
+        return self._profile is not None or self._sampler is not None
+
+    def start(self):
+        """
+        Function to start a profiling window (called from the main thread).
+        """
+        if self.active:
+            return
+        self._started = datetime.now()
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._stacks = {}
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        print(f'Profiling started ({self.mode})')
+
+    def stop(self):
+        """
+        Function to stop the profiling window and save the profile.
+        Returns:
+            path (None or str): the path of the saved profile, None if no window was active
+        """
+        if not self.active:
+            return None
+        filename = f'profile_{self._started.strftime("%Y%m%d_%H%M%S")}'
+        if self._profile is not None:
+            self._profile.disable()
+            path = os.path.join(self.directory, filename + '.pstats')
+            self._profile.dump_stats(path)
+            self._profile = None
+        else:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+            path = os.path.join(self.directory, filename + '.collapsed')
+            with open(path, 'w') as file:
+                for stack, samples in sorted(self._stacks.items(), key=lambda item: -item[1]):
+                    file.write(f'{stack} {samples}\n')
+        print(f'Profiling stopped, profile saved to {path}')
+        return path
+
+    def toggle(self, mode=None):
+        """
+        Function to start a profiling window, or to stop the active one. If the active window has another mode, it is
+        stopped and saved, and a window of the given mode is started instead.
+        Args:
+            mode (None or str): 'cprofile' or 'sampling', the mode of the profiler if None
+        Returns:
+            path (None or str): the path of the saved profile if a window was stopped, None otherwise
+        """
+        mode = self.mode if mode is None else mode
+        if mode not in ('cprofile', 'sampling'):
+            raise ValueError(f'Unknown profiling mode: {mode}')
+        if self.active and mode == self.mode:
+            return self.stop()
+        path = self.stop()  # the window of the other mode, if any
+        self.mode = mode
+        self.start()
+        return path
+
+    def _sample(self):
+        """
+        Function run by the sampling thread: counts the collapsed stacks of all other threads until stopped.
+        """
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))  # the root of the stack is the thread
+                collapsed = ';'.join(reversed(stack))
+                self._stacks[collapsed] = self._stacks.get(collapsed, 0) + 1
@@ -0,0 +1,457 @@
+import argparse
+import os
+
+import numpy as np
+
+import board_script
+
+"""
+This script recognises the objects on a board of the Conway's game of life (still lifes, oscillators, spaceships).
+The living cells are grouped into clusters with a vectorised connected-component labelling: cells which are at most
+`radius` cells apart (in any direction, diagonals included) belong to the same cluster. The default radius of 2 keeps
+objects like the pulsar, whose parts are separated by a single dead cell, in one cluster. The labelling is a union-find
+over the pairs of close living cells, so most of its work is on the living cells rather than on the whole board.
+Every cluster is cropped to its bounding box and canonicalised under the 8 rotations and reflections, so an object is
+recognised whatever its orientation. The canonical form is looked up in a hash index of known objects, which holds
+every phase of:
+- a few common small objects defined below (block, beehive, glider, ...)
+- the patterns of the pattern scripts of the game (bar oscillator, glider gun, pulsar, Soba spaceship)
+- any pattern library loaded with load_library() (a directory of plaintext .cells files, dots and O's)
+Objects made of several clusters (e.g. the glider gun and the Soba spaceship) are indexed as composites: every phase, in
+each of the 8 orientations, is stored as the set of its clusters at their offsets from its largest cluster. After the
+clusters of a board are identified, the clusters forming a composite at the same offsets are merged into one object.
+Recognised clusters are cached between generations by their exact cells, so clusters which did not change (e.g. still
+lifes) are not canonicalised again.
+Usage example (random board, census every 50 generations):
+    python object_recogniser.py --generations 500 --every 50
+"""
+
+states = 0
+
+# common small objects, in the same format as the pattern scripts (dots are dead cells and O's are living cells)
+COMMON_OBJECTS = {
+    'block': """
+        OO
+        OO
+        """,
+    'beehive': """
+        .OO.
+        O..O
+        .OO.
+        """,
+    'loaf': """
+        .OO.
+        O..O
+        .O.O
+        ..O.
+        """,
+    'boat': """
+        OO.
+        O.O
+        .O.
+        """,
+    'ship': """
+        OO.
+        O.O
+        .OO
+        """,
+    'tub': """
+        .O.
+        O.O
+        .O.
+        """,
+    'pond': """
+        .OO.
+        O..O
+        O..O
+        .OO.
+        """,
+    'blinker': """
+        OOO
+        """,
+    'toad': """
+        .OOO
+        OOO.
+        """,
+    'beacon': """
+        OO..
+        OO..
+        ..OO
+        ..OO
+        """,
+    'glider': """
+        .O.
+        ..O
+        OOO
+        """,
+    'lightweight spaceship': """
+        .O..O
+        O....
+        O...O
+        OOOO.
+        """,
+}
+
+# pattern scripts of the game and the names of their objects
+PATTERN_SCRIPTS = {
+    'bar oscillator': 'bar_oscillator_script',
+    'glider gun': 'glider_gun_script',
+    'pulsar': 'pulsar_script',
+    'Soba spaceship': 'soba_script',
+}
+
+
+def orientations(cells):
+    """
+    Function to list the 8 rotations and reflections of a pattern as views (flips of the pattern and of its transpose).
+    Args:
+        cells (numpy.ndarray): the pattern (2D)
+    Returns:
+        variants (list): the 8 orientations
+    """
+    return [flipped for variant in (cells, cells.T)
+            for flipped in (variant, variant[::-1], variant[:, ::-1], variant[::-1, ::-1])]
+
+
+def canonical_key(cells):
+    """
+    Function to compute the canonical form of a cluster, the same for all its rotations and reflections.
+    Args:
+        cells (numpy.ndarray): the cells of the cluster cropped to its bounding box (2D, nonzero is alive)
+    Returns:
+        key (tuple): the shape and the bit-packed cells of the smallest of the 8 orientations
+    """
+    return min((variant.shape, np.packbits(variant).tobytes()) for variant in orientations(cells != 0))
+
+
+def crop(cells):
+    """
+    Function to crop the living cells of a pattern to their bounding box.
+    Args:
+        cells (numpy.ndarray): the pattern (2D, nonzero is alive)
+    Returns:
+        cropped (numpy.ndarray): the cropped pattern, an empty array if no cell is alive
+    """
+    xs, ys = np.nonzero(cells)
+    if len(xs) == 0:
+        return cells[:0, :0]
+    return cells[xs.min():xs.max() + 1, ys.min():ys.max() + 1]
+
+
+def label_clusters(cells, radius=2):
+    """
+    Function to label the clusters of living cells with a vectorised connected-component labelling.
+    The pairs of living cells which are at most radius cells apart are collected with shifted views of the board, then
+    the clusters are joined with a vectorised union-find: the root of every pair with two different roots is hooked to
+    the smaller root and the roots are followed to their own roots (pointer jumping), until every pair has one root.
+    Args:
+        cells (numpy.ndarray): the states of the board (2D, nonzero is alive)
+        radius (int): cells which are at most radius cells apart belong to the same cluster
+    Returns:
+        labels (numpy.ndarray): for every cell the flat index of the first cell of its cluster, -1 for dead cells
+    """
+    alive = cells != 0
+    x, y = alive.shape
+    alive_flat = np.flatnonzero(alive)
+    index = np.full((x, y), -1, dtype=np.int64)  # number of every living cell, in the order of the flat indices
+    index.reshape(-1)[alive_flat] = np.arange(len(alive_flat))
+
+    # Pairs of living cells in half of the neighbourhood (the other half gives the same pairs)
+    first, second = [], []
+    for di in range(radius + 1):
+        for dj in range(-radius, radius + 1):
+            if di == 0 and dj <= 0:
+                continue
+            a = index[0:x - di, max(0, -dj):y - max(0, dj)]
+            b = index[di:x, max(0, dj):y + min(0, dj)]
+            both = (a >= 0) & (b >= 0)
+            first.append(a[both])
+            second.append(b[both])
+    first, second = np.concatenate(first), np.concatenate(second)
+
+    parent = np.arange(len(alive_flat))
+    while True:
+        root_a, root_b = parent[first], parent[second]
+        differ = root_a != root_b
+        if not differ.any():
+            break
+        np.minimum.at(parent, np.maximum(root_a, root_b)[differ], np.minimum(root_a, root_b)[differ])
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+    # The root of a cluster is its living cell with the smallest flat index
+    labels = np.full(x * y, -1, dtype=np.int64)
+    labels[alive_flat] = alive_flat[parent]
+    return labels.reshape(x, y)
+
+
+def cluster_boxes(labels):
+    """
+    Function to find the bounding boxes of all clusters of a labelling at once.
+    Args:
+        labels (numpy.ndarray): the labels of the cells, see label_clusters()
+    Returns:
+        boxes (list): one tuple per cluster with the label and the bounding box x0, y0, x1, y1 (inclusive)
+    """
+    xs, ys = np.nonzero(labels >= 0)
+    if len(xs) == 0:
+        return []
+    cluster_labels = labels[xs, ys]
+    order = np.argsort(cluster_labels, kind='stable')
+    xs, ys, cluster_labels = xs[order], ys[order], cluster_labels[order]
+    unique, starts = np.unique(cluster_labels, return_index=True)
+    x0, x1 = np.minimum.reduceat(xs, starts), np.maximum.reduceat(xs, starts)
+    y0, y1 = np.minimum.reduceat(ys, starts), np.maximum.reduceat(ys, starts)
+    return [(label, int(a), int(b), int(c), int(d)) for label, a, b, c, d in zip(unique, x0, y0, x1, y1)]
+
+
+def exact_key(cells):
+    """
+    Function to compute the key of the exact cells of a cluster (in its orientation).
+    Args:
+        cells (numpy.ndarray): the cells of the cluster cropped to its bounding box (2D, boolean)
+    Returns:
+        key (tuple): the shape and the bit-packed cells
+    """
+    return cells.shape, np.packbits(cells).tobytes()
+
+
+def pattern_phases(pattern, max_generations=64):
+    """
+    Function to compute the canonical forms of the phases of a pattern by running it on an empty board.
+    The pattern is run until its first phase comes back (oscillators and spaceships) or for max_generations.
+    Args:
+        pattern (numpy.ndarray): the pattern (2D, nonzero is alive)
+        max_generations (int): the maximal number of generations
+    Returns:
+        keys (list): the canonical forms of the phases
+    """
+    return [key for key, _ in phases(pattern, max_generations)]
+
+
+def phases(pattern, max_generations=64):
+    """
+    Function to run a pattern on an empty board until its first phase comes back or for max_generations.
+    Args:
+        pattern (numpy.ndarray): the pattern (2D, nonzero is alive)
+        max_generations (int): the maximal number of generations
+    Returns:
+        phases (list): the canonical form and the cells cropped to the bounding box (boolean) of every phase
+    """
+    pattern = crop(np.asarray(pattern))
+    pad = max_generations // 2 + 4  # spaceships move at most at half the speed of light
+    board = np.zeros((pattern.shape[0] + 2 * pad, pattern.shape[1] + 2 * pad, 2), dtype=int)
+    board[pad:pad + pattern.shape[0], pad:pad + pattern.shape[1], states] = pattern != 0
+
+    found = []
+    for generation in range(max_generations):
+        cropped = crop(board[:, :, states]) != 0
+        if cropped.size == 0:
+            break
+        key = canonical_key(cropped)
+        if found and key == found[0][0]:
+            break
+        found.append((key, cropped))
+        board_script.update_board(board)
+    return found
+
+
+def load_library(path):
+    """
+    Function to load a pattern library from a directory of plaintext .cells files (dots and O's, lines starting with
+    '!' are comments).
+    Args:
+        path (str): the directory of the library
+    Returns:
+        patterns (dict): the patterns by name (the file name without extension)
+    """
+    patterns = {}
+    for filename in sorted(os.listdir(path)):
+        if not filename.endswith('.cells'):
+            continue
+        with open(os.path.join(path, filename)) as file:
+            lines = [line.rstrip('\n') for line in file if not line.startswith('!')]
+        width = max(len(line) for line in lines)
+        lines = [line.ljust(width, '.') for line in lines]  # trailing dead cells are often left out
+        patterns[os.path.splitext(filename)[0]] = board_script.pattern_from_str('\n'.join(lines))
+    return patterns
+
+
+class ObjectRecogniser:
+    def __init__(self, library=None, radius=2, max_generations=64, cache_size=10000):
+        """
+        Class to recognise the objects on a board
+        Args:
+            library (None, str or dict): a directory of .cells files or a dictionary of patterns by name to be
+                recognised in addition to the common objects and the pattern scripts
+            radius (int): cells which are at most radius cells apart belong to the same cluster
+            max_generations (int): the maximal number of generations run to find the phases of a pattern
+            cache_size (int): the maximal number of clusters kept in the cache
+        Attributes:
+            index (dict): the names of the known objects by the canonical form of each of their phases
+            composites (list): the name and the clusters (exact key, offset x, offset y) of every phase and orientation
+                of the objects made of several clusters, the phases with the most clusters first
+        """
+        self.radius = radius
+        self.max_generations = max_generations
+        self.cache_size = cache_size
+        self.index = {}
+        self.composites = []
+        self._cache = {}  # exact cells of a cluster -> name
+
+        for name, pattern in COMMON_OBJECTS.items():
+            self.add(name, board_script.pattern_from_str(pattern))
+        for name, script_name in PATTERN_SCRIPTS.items():
+            self.add(name, board_script.load_pattern(script_name))
+        if isinstance(library, str):
+            library = load_library(library)
+        for name, pattern in (library or {}).items():
+            self.add(name, pattern)
+
+    def add(self, name, pattern):
+        """
+        Function to add all phases of a pattern to the index; phases which are already known keep their name.
+        Phases made of several clusters are added to the composites instead.
+        Args:
+            name (str): the name of the object
+            pattern (numpy.ndarray or str): the pattern, as an array or a string of dots and O's
+        """
+        if isinstance(pattern, str):
+            pattern = board_script.pattern_from_str(pattern)
+        known = {tuple(components) for _, components in self.composites}
+        for key, cells in phases(pattern, self.max_generations):
+            if len(cluster_boxes(label_clusters(cells, self.radius))) == 1:
+                self.index.setdefault(key, name)
+                continue
+            for variant in orientations(cells):
+                components = self._components(variant)
+                if components not in known:
+                    known.add(components)
+                    self.composites.append((name, components))
+        self.composites.sort(key=lambda composite: -len(composite[1]))  # stable, the first added name wins
+        self._cache.clear()
+
+    def _components(self, cells):
+        """
+        Function to split a phase of a composite object into its clusters.
+        Args:
+            cells (numpy.ndarray): the phase in one orientation (2D, boolean)
+        Returns:
+            components (tuple): the exact key and the offset of every cluster from the largest cluster (which is first)
+        """
+        labels = label_clusters(cells, self.radius)
+        clusters = [(np.count_nonzero(part), exact_key(part), a, b)
+                    for label, a, b, c, d in cluster_boxes(labels)
+                    for part in [labels[a:c + 1, b:d + 1] == label]]
+        clusters.sort(key=lambda cluster: (-cluster[0], cluster[2], cluster[3]))
+        _, _, x0, y0 = clusters[0]
+        return tuple((exact, a - x0, b - y0) for _, exact, a, b in clusters)
+
+    def identify(self, cells, exact=None):
+        """
+        Function to identify a single cluster.
+        Args:
+            cells (numpy.ndarray): the cells of the cluster cropped to its bounding box
+            exact (None or tuple): the exact key of the cells if already known, see exact_key()
+        Returns:
+            name (str): the name of the object, 'unknown' if it is not in the index
+        """
+        exact = exact_key(cells != 0) if exact is None else exact
+        name = self._cache.get(exact)
+        if name is None:
+            name = self.index.get(canonical_key(cells), 'unknown')
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[exact] = name
+        return name
+
+    def clusters(self, board):
+        """
+        Function to find and identify the clusters of a board.
+        Args:
+            board (numpy.ndarray): the board, either the states (x, y) or the full board (x, y, 2)
+        Returns:
+            clusters (list): one tuple per cluster with the name and the bounding box (x0, y0, x1, y1), inclusive
+        """
+        cells = board[:, :, states] if board.ndim == 3 else board
+        labels = label_clusters(cells, self.radius)
+
+        found, exacts = [], []
+        for label, a, b, c, d in cluster_boxes(labels):
+            cluster = labels[a:c + 1, b:d + 1] == label
+            exact = exact_key(cluster)
+            found.append((self.identify(cluster, exact), (a, b, c, d)))
+            exacts.append(exact)
+        return self._merge_composites(found, exacts) if self.composites else found
+
+    def _merge_composites(self, found, exacts):
+        """
+        Function to merge the clusters which form a composite object at the offsets of one of its phases.
+        Args:
+            found (list): the name and the bounding box of every cluster
+            exacts (list): the exact key of every cluster
+        Returns:
+            found (list): the same clusters, the clusters of every composite replaced by a single object
+        """
+        at = {}  # (exact key, x0, y0) -> number of the cluster
+        by_exact = {}  # exact key -> numbers of the clusters
+        for i, (exact, (a, b, _, _)) in enumerate(zip(exacts, (box for _, box in found))):
+            at[(exact, a, b)] = i
+            by_exact.setdefault(exact, []).append(i)
+
+        used, merged = set(), {}  # merged: number of the anchor cluster -> composite object
+        for name, components in self.composites:
+            for i in by_exact.get(components[0][0], ()):
+                x0, y0 = found[i][1][0], found[i][1][1]
+                members = [at.get((exact, x0 + dx, y0 + dy)) for exact, dx, dy in components]
+                if None in members or not used.isdisjoint(members):
+                    continue
+                used.update(members)
+                boxes = [found[member][1] for member in members]
+                merged[i] = (name, (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                                    max(box[2] for box in boxes), max(box[3] for box in boxes)))
+        return [merged[i] if i in merged else cluster for i, cluster in enumerate(found)
+                if i in merged or i not in used]
+
+    def census(self, board):
+        """
+        Function to count the objects on a board.
+        Args:
+            board (numpy.ndarray): the board, either the states (x, y) or the full board (x, y, 2)
+        Returns:
+            counts (dict): the number of objects by name, most frequent first
+        """
+        counts = {}
+        for name, _ in self.clusters(board):
+            counts[name] = counts.get(name, 0) + 1
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+def main(argv=None):
+    """
+    Run a random board without a display and print its object census from the command line.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    parser = argparse.ArgumentParser(description="Object census of a random board of the Conway's game of life")
+    parser.add_argument('--size', type=int, default=100, help='width and height of the board')
+    parser.add_argument('--density', type=float, default=0.2, help='proportion of living cells')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random board')
+    parser.add_argument('--generations', type=int, default=1000, help='number of generations')
+    parser.add_argument('--every', type=int, default=100, help='generations between two censuses')
+    parser.add_argument('--library', default=None, help='directory of .cells files with additional objects')
+    args = parser.parse_args(argv)
+
+    recogniser = ObjectRecogniser(args.library)
+    board = board_script.create_board(args.size, args.size, args.density, np.random.default_rng(args.seed))
+    for generation in range(args.generations + 1):
+        if generation % args.every == 0:
+            print(f'generation {generation}: {recogniser.census(board)}')
+        board_script.update_board(board)
+
+
+if __name__ == '__main__':
+    main()
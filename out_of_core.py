@@ -0,0 +1,325 @@
+import argparse
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+"""
+This script runs the Conway's game of life on boards which are too large for the (x, y, 2) array of the game.
+The board is kept on disk in two memory-mapped files, <path>.0 and <path>.1, each holding a 32 byte header (magic,
+size of the board and generation) followed by the states bit-packed row by row (8 cells per byte).
+A generation is computed by streaming bands of rows through memory: every band is read together with one row above
+and below it (the halo), unpacked, updated and packed again into the other file. The next band is read in a background
+thread while the current one is computed, and the finished bands are written in another thread, so I/O overlaps with
+the computation. The number of rows per band is derived from the memory budget. Once all bands are written the file
+gets its new generation number and the two files swap their roles.
+The same rules and boundary condition as in board_script.update_board are used: the cells on the edges keep their state.
+While a file is being written its generation is set to -1, so readers (see BoardView) always pick the latest complete
+generation and can detect when a region they read was overwritten meanwhile.
+Usage example:
+    python out_of_core.py create big --size 50000 50000 --seed 1
+    python out_of_core.py run big --generations 10 --memory 256
+    python out_of_core.py view big
+"""
+
+HEADER = struct.Struct('<4s4xQQq')  # magic, x, y, generation (-1 while the file is written)
+MAGIC = b'GOLB'
+
+
+def _paths(path):
+    return f'{path}.0', f'{path}.1'
+
+
+def _write_header(mapped_header, x, y, generation):
+    mapped_header[:] = np.frombuffer(HEADER.pack(MAGIC, x, y, generation), dtype=np.uint8)
+    mapped_header.flush()
+
+
+def _read_header(path):
+    with open(path, 'rb') as file:
+        magic, x, y, generation = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a board file')
+    return x, y, generation
+
+
+def _open(path, mode='r+'):
+    """
+    Function to memory-map a board file.
+    Args:
+        path (str): the path of the file
+        mode (str): 'r+' to read and write, 'r' to read only
+    Returns:
+        header (numpy.memmap): the header bytes
+        rows (numpy.memmap): the bit-packed rows, shape (x, ceil(y / 8))
+    """
+    x, y, _ = _read_header(path)
+    header = np.memmap(path, dtype=np.uint8, mode=mode, offset=0, shape=(HEADER.size,))
+    rows = np.memmap(path, dtype=np.uint8, mode=mode, offset=HEADER.size, shape=(x, (y + 7) // 8))
+    return header, rows
+
+
+def create(path, x, y, density=0.2, seed=None, band_rows=1024):
+    """
+    Function to create a random board on disk without holding it in memory; the cells on the edges are dead.
+    Args:
+        path (str): the base path of the board files
+        x (int): the number of rows of the board
+        y (int): the number of columns of the board
+        density (float): the proportion of living cells
+        seed (None or int): the seed of the random board
+        band_rows (int): the number of rows created at once
+    """
+    rng = np.random.default_rng(seed)
+    for i, file_path in enumerate(_paths(path)):
+        with open(file_path, 'wb') as file:
+            file.truncate(HEADER.size + x * ((y + 7) // 8))
+        header = np.memmap(file_path, dtype=np.uint8, mode='r+', shape=(HEADER.size,))
+        _write_header(header, x, y, -1)
+        if i == 0:
+            _, rows = _open(file_path)
+            for r0 in range(0, x, band_rows):
+                r1 = min(r0 + band_rows, x)
+                cells = (rng.random((r1 - r0, y)) < density).astype(np.uint8)
+                cells[:, 0] = 0
+                cells[:, y - 1] = 0
+                if r0 == 0:
+                    cells[0] = 0
+                if r1 == x:
+                    cells[-1] = 0
+                rows[r0:r1] = np.packbits(cells, axis=1)
+            rows.flush()
+            _write_header(header, x, y, 0)
+
+
+def save(path, cells):
+    """
+    Function to save a board held in memory as board files, e.g. to continue a small board out of core.
+    Args:
+        path (str): the base path of the board files
+        cells (numpy.ndarray): the states of the board (2D, nonzero is alive)
+    """
+    x, y = cells.shape
+    create(path, x, y, density=0)
+    header, rows = _open(_paths(path)[0])
+    rows[:] = np.packbits(cells != 0, axis=1)
+    rows.flush()
+    _write_header(header, x, y, 0)
+
+
+class OutOfCoreEngine:
+    def __init__(self, path, memory_budget=256 * 2 ** 20):
+        """
+        Class to advance a board stored on disk band by band
+        Args:
+            path (str): the base path of the board files (created with create() or save())
+            memory_budget (int): the memory used for the bands in bytes
+        Attributes:
+            x (int): the number of rows of the board
+            y (int): the number of columns of the board
+            generation (int): the current generation
+            band_rows (int): the number of rows computed at once
+        """
+        self.paths = _paths(path)
+        self._files = [_open(file_path) for file_path in self.paths]
+        generations = [_read_header(file_path)[2] for file_path in self.paths]
+        self.current = int(np.argmax(generations))  # index of the file holding the latest complete generation
+        self.generation = generations[self.current]
+        self.x, self.y, _ = _read_header(self.paths[0])
+
+        # Each row of a band needs about 16 bytes per cell: the unpacked cells, the neighbours count, the new cells
+        # and the temporaries of the rules, twice as the next band is read meanwhile
+        self.band_rows = max(1, min(self.x, memory_budget // (16 * self.y)))
+
+    def _read_band(self, rows, r0, r1):
+        """
+        Function to read a band of packed rows together with its halo.
+        Returns:
+            in0 (int): the first row read
+            packed (numpy.ndarray): the packed rows, copied into memory
+        """
+        in0, in1 = max(r0 - 1, 0), min(r1 + 1, self.x)
+        return in0, np.array(rows[in0:in1])
+
+    def _compute_band(self, r0, r1, in0, packed):
+        """
+        Function to compute the next generation of a band of rows.
+        Returns:
+            packed (numpy.ndarray): the packed rows r0 to r1 of the next generation
+        """
+        x, y = self.x, self.y
+        cells = np.unpackbits(packed, axis=1, count=y)
+        new = cells[r0 - in0:r1 - in0].copy()  # the cells on the edges keep their state
+
+        ir0, ir1 = max(r0, 1), min(r1, x - 1)  # inner rows of the band
+        if ir0 < ir1 and y > 2:
+            a, b = ir0 - in0, ir1 - in0
+            counts = np.zeros((ir1 - ir0, y - 2), dtype=np.uint8)
+            for di in [-1, 0, 1]:
+                for dj in [-1, 0, 1]:
+                    if di != 0 or dj != 0:
+                        counts += cells[a + di:b + di, 1 + dj:y - 1 + dj]
+            alive = cells[a:b, 1:y - 1].view(bool)
+            new[ir0 - r0:ir1 - r0, 1:y - 1] = (counts == 3) | ((counts == 2) & alive)
+        return np.packbits(new, axis=1)
+
+    def step(self):
+        """
+        Function to compute the next generation into the other file and swap the files.
+        """
+        source_rows = self._files[self.current][1]
+        target_header, target_rows = self._files[1 - self.current]
+        _write_header(target_header, self.x, self.y, -1)  # readers must not use the file while it is written
+
+        bands = [(r0, min(r0 + self.band_rows, self.x)) for r0 in range(0, self.x, self.band_rows)]
+        with ThreadPoolExecutor(1) as reader, ThreadPoolExecutor(1) as writer:
+            pending_read = reader.submit(self._read_band, source_rows, *bands[0])
+            pending_write = None
+            for i, (r0, r1) in enumerate(bands):
+                in0, packed = pending_read.result()
+                if i + 1 < len(bands):
+                    pending_read = reader.submit(self._read_band, source_rows, *bands[i + 1])  # prefetch
+                result = self._compute_band(r0, r1, in0, packed)
+                if pending_write is not None:
+                    pending_write.result()  # at most one band waits to be written
+                pending_write = writer.submit(target_rows.__setitem__, slice(r0, r1), result)
+            pending_write.result()
+
+        target_rows.flush()
+        self.generation += 1
+        _write_header(target_header, self.x, self.y, self.generation)
+        self.current = 1 - self.current
+
+    def run(self, generations):
+        """
+        Function to compute several generations.
+        Args:
+            generations (int): the number of generations
+        """
+        for _ in range(generations):
+            self.step()
+
+
+class BoardView:
+    def __init__(self, path):
+        """
+        Class to attach read-only to board files, e.g. while an OutOfCoreEngine is running
+        Args:
+            path (str): the base path of the board files
+        Attributes:
+            x (int): the number of rows of the board
+            y (int): the number of columns of the board
+        """
+        self._files = [_open(file_path, 'r') for file_path in _paths(path)]
+        self.x, self.y, _ = _read_header(_paths(path)[0])
+
+    def _generation(self, i):
+        return HEADER.unpack(self._files[i][0].tobytes())[3]
+
+    def region(self, x0, y0, width, height):
+        """
+        Function to read a region of the latest complete generation.
+        Args:
+            x0 (int): the first row of the region
+            y0 (int): the first column of the region
+            width (int): the number of rows of the region
+            height (int): the number of columns of the region
+        Returns:
+            generation (int): the generation of the region, -1 if the region was overwritten while it was read
+            cells (numpy.ndarray): the states of the region, 2D uint8 array of 0 and 1
+        """
+        x0, y0 = max(0, min(x0, self.x - 1)), max(0, min(y0, self.y - 1))
+        x1, y1 = min(x0 + width, self.x), min(y0 + height, self.y)
+        i = int(np.argmax([self._generation(0), self._generation(1)]))
+        generation = self._generation(i)
+        packed = np.array(self._files[i][1][x0:x1, y0 // 8:(y1 + 7) // 8])
+        cells = np.unpackbits(packed, axis=1)[:, y0 % 8:y0 % 8 + (y1 - y0)]
+        if self._generation(i) != generation:
+            generation = -1  # the engine started writing into this file meanwhile
+        return generation, cells
+
+
+def view(path, size=(800, 800), cell_size=4):
+    """
+    Function to show the region of a board under the camera in a pygame window; the board files are only read.
+    Arrow keys move the camera, '+' and '-' zoom.
+    Args:
+        path (str): the base path of the board files
+        size (tuple): the size of the window
+        cell_size (int): the initial size of a cell in pixels
+    """
+    import pygame  # imported lazily, the engine does not need a display
+
+    board = BoardView(path)
+    pygame.display.init()
+    screen = pygame.display.set_mode(size)
+    clock = pygame.time.Clock()
+    camera_x, camera_y = 0, 0
+    running = True
+    while running:
+        width, height = size[0] // cell_size, size[1] // cell_size  # cells under the camera
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    camera_x -= width // 4
+                if event.key == pygame.K_RIGHT:
+                    camera_x += width // 4
+                if event.key == pygame.K_UP:
+                    camera_y -= height // 4
+                if event.key == pygame.K_DOWN:
+                    camera_y += height // 4
+                if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    cell_size = min(cell_size * 2, 64)
+                if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    cell_size = max(cell_size // 2, 1)
+        camera_x = max(0, min(camera_x, board.x - width))
+        camera_y = max(0, min(camera_y, board.y - height))
+
+        generation, cells = board.region(camera_x, camera_y, width, height)
+        if generation >= 0:  # skip regions which were overwritten while they were read
+            region = pygame.surfarray.make_surface(cells * np.uint8(255))
+            region.set_palette([(i, i, i) for i in range(256)])
+            screen.fill((0, 0, 0))
+            screen.blit(pygame.transform.scale(region, (cells.shape[0] * cell_size, cells.shape[1] * cell_size)),
+                        (0, 0))
+            pygame.display.set_caption(f"Conway's Game - generation {generation} - cells ({camera_x}, {camera_y})")
+        pygame.display.flip()
+        clock.tick(30)
+    pygame.quit()
+
+
+def main(argv=None):
+    """
+    Create, run or view a board stored on disk from the command line.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    parser = argparse.ArgumentParser(description="Conway's game of life on boards larger than the memory")
+    parser.add_argument('mode', choices=['create', 'run', 'view'], help='create, run or view a board')
+    parser.add_argument('path', help='base path of the board files')
+    parser.add_argument('--size', type=int, nargs=2, default=[10000, 10000], help='rows and columns (create)')
+    parser.add_argument('--density', type=float, default=0.2, help='proportion of living cells (create)')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random board (create)')
+    parser.add_argument('--generations', type=int, default=1, help='number of generations (run)')
+    parser.add_argument('--memory', type=int, default=256, help='memory budget in MB (run)')
+    args = parser.parse_args(argv)
+
+    if args.mode == 'create':
+        create(args.path, args.size[0], args.size[1], args.density, args.seed)
+    elif args.mode == 'run':
+        engine = OutOfCoreEngine(args.path, args.memory * 2 ** 20)
+        print(f'board of {engine.x} x {engine.y} cells at generation {engine.generation}, '
+              f'{engine.band_rows} rows per band')
+        for _ in range(args.generations):
+            start = time.perf_counter()
+            engine.step()
+            print(f'generation {engine.generation} computed in {time.perf_counter() - start:.2f} s')
+    else:
+        view(args.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 """
 This script is used to create a pulsar pattern for the Conway's game of life.
 The board is a 3D numpy array with the following shape: (x, y, 1). The first two dimensions represent the region 
@@ -0,0 +1,348 @@
+import argparse
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+import board_script
+
+"""
+This script keeps every generation of a run of the Conway's game of life in a compressed, seekable archive file, for
+analysis after the run (the interactive game writes one with --archive).
+The file starts with a header (magic, size of the board and keyframe interval), followed by one record per generation:
+a record header (kind, generation, payload length) and the zlib compressed, bit-packed cells. Keyframes hold the full
+state plane, deltas only the XOR with the previous record, which is mostly zeros and compresses very well. A keyframe
+is written every keyframe_every records.
+The file is only appended to. When the archive is closed, an index of the generation and the byte offset of every record
+is appended as a footer, followed by its position; an archive which was not closed (e.g. after a crash) is indexed by
+scanning its records instead.
+The records are compressed and written by a background thread, so the simulation only pays for a copy of the states.
+The reader memory-maps the file, finds a generation in the index and decodes it from the previous keyframe, so reading
+any generation takes a time proportional to its distance to a keyframe, and streaming through the generations decodes
+every record once, whatever the length of the run.
+A generation can be recorded several times (e.g. after an edit of the board between two generations); the last record
+of a generation is the one read.
+Usage example:
+    python run_archive.py record run.golr --size 200 --generations 100000
+    python run_archive.py info run.golr
+    python run_archive.py view run.golr
+"""
+
+HEADER = struct.Struct('<4s4xQQQ')  # magic, x, y, keyframe_every
+RECORD = struct.Struct('<B7xqQ')  # kind, generation, payload length
+FOOTER = struct.Struct('<QQ4s')  # number of records, offset of the index, magic
+MAGIC, INDEX_MAGIC = b'GOLR', b'GOLI'
+KEYFRAME, DELTA = 0, 1
+
+states = 0
+
+
+class ArchiveWriter:
+    def __init__(self, path, x, y, keyframe_every=100, queue_size=64):
+        """
+        Class to append generations to a new archive from a background thread
+        Args:
+            path (str): the path of the archive file
+            x (int): the width of the board
+            y (int): the height of the board
+            keyframe_every (int): the number of records between two keyframes
+            queue_size (int): the maximal number of generations waiting to be written; append() blocks when it is
+                reached, so no generation is lost
+        Attributes:
+            records (int): the number of records written so far
+        """
+        self.x, self.y = x, y
+        self.keyframe_every = keyframe_every
+        self.records = 0
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, x, y, keyframe_every))
+        self._index = []  # (generation, offset) of every record
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._write_records, name='ArchiveWriter', daemon=True)
+        self._thread.start()
+
+    def append(self, generation, cells):
+        """
+        Function to queue a generation to be written.
+        Args:
+            generation (int): the generation number, not smaller than the previous one
+            cells (numpy.ndarray): the states of the board, shape (x, y), nonzero is alive; the board may be changed
+                right after the call
+        """
+        self._queue.put((generation, cells != 0))
+
+    def close(self):
+        """
+        Function to write the queued generations and the index, and to close the file.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        index = np.array(self._index, dtype=np.int64).reshape(-1, 2)
+        offset = self._file.tell()
+        self._file.write(index.tobytes())
+        self._file.write(FOOTER.pack(len(index), offset, INDEX_MAGIC))
+        self._file.close()
+
+    def _write_records(self):
+        previous = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            generation, cells = item
+            if self.records % self.keyframe_every == 0:
+                kind, payload = KEYFRAME, cells
+            else:
+                kind, payload = DELTA, cells ^ previous
+            compressed = zlib.compress(np.packbits(payload).tobytes(), 1)
+            self._index.append((generation, self._file.tell()))
+            self._file.write(RECORD.pack(kind, generation, len(compressed)))
+            self._file.write(compressed)
+            previous = cells
+            self.records += 1
+
+
+class RunArchive:
+    def __init__(self, path):
+        """
+        Class to read the generations of an archive, memory-mapped
+        Args:
+            path (str): the path of the archive file
+        Attributes:
+            x (int): the width of the board
+            y (int): the height of the board
+            generations (numpy.ndarray): the generation number of every record, in the order of the records
+            closed (bool): False if the archive was not closed and had to be indexed by scanning it
+        """
+        self._data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, self.x, self.y, self.keyframe_every = HEADER.unpack(self._data[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a run archive')
+
+        count, index_offset, index_magic = FOOTER.unpack(self._data[-FOOTER.size:].tobytes())
+        self.closed = index_magic == INDEX_MAGIC
+        if self.closed:
+            index = np.frombuffer(self._data, dtype=np.int64, count=2 * count, offset=index_offset).reshape(-1, 2)
+        else:
+            index = self._scan()
+        self.generations, self._offsets = index[:, 0], index[:, 1]
+        self._kinds = self._data[self._offsets] if len(index) else np.zeros(0, dtype=np.uint8)
+        self._keyframes = np.flatnonzero(self._kinds == KEYFRAME)
+        self._cache = None  # (record, cells) of the last decoded record, to stream without seeking
+
+    def __len__(self):
+        return len(self.generations)
+
+    def _scan(self):
+        """
+        Function to index an archive which was not closed by reading its record headers.
+        Returns:
+            index (numpy.ndarray): the generation and the offset of every complete record, shape (records, 2)
+        """
+        index = []
+        offset = HEADER.size
+        while offset + RECORD.size <= len(self._data):
+            _, generation, length = RECORD.unpack(self._data[offset:offset + RECORD.size].tobytes())
+            if offset + RECORD.size + length > len(self._data):
+                break  # the last record was not written completely
+            index.append((generation, offset))
+            offset += RECORD.size + length
+        return np.array(index, dtype=np.int64).reshape(-1, 2)
+
+    def _payload(self, record):
+        """
+        Function to decode the cells of the keyframe or the XOR of the delta of a record.
+        Args:
+            record (int): the number of the record
+        Returns:
+            cells (numpy.ndarray): 2D boolean array
+        """
+        offset = int(self._offsets[record])
+        _, _, length = RECORD.unpack(self._data[offset:offset + RECORD.size].tobytes())
+        start = offset + RECORD.size
+        packed = np.frombuffer(zlib.decompress(self._data[start:start + length]), dtype=np.uint8)
+        return np.unpackbits(packed, count=self.x * self.y).reshape(self.x, self.y).view(bool)
+
+    def record(self, record):
+        """
+        Function to read the board of a record, decoded from the previous keyframe (or from the last decoded record if
+        it is closer).
+        Args:
+            record (int): the number of the record, negative numbers count from the end
+        Returns:
+            cells (numpy.ndarray): the states of the board, 2D boolean array
+        """
+        record = range(len(self))[record]
+        keyframe = int(self._keyframes[np.searchsorted(self._keyframes, record, side='right') - 1])
+        if self._cache is not None and keyframe <= self._cache[0] <= record:
+            start, cells = self._cache[0], self._cache[1].copy()
+        else:
+            start, cells = keyframe, self._payload(keyframe)
+        for i in range(start + 1, record + 1):
+            cells ^= self._payload(i)
+        self._cache = (record, cells)
+        return cells.copy()
+
+    def read(self, generation):
+        """
+        Function to read a generation, i.e. its last record.
+        Args:
+            generation (int): the generation number
+        Returns:
+            cells (numpy.ndarray): the states of the board, 2D boolean array
+        """
+        record = np.searchsorted(self.generations, generation, side='right') - 1
+        if record < 0 or self.generations[record] != generation:
+            raise KeyError(f'generation {generation} is not in the archive')
+        return self.record(int(record))
+
+    def stream(self, start=0, stop=None):
+        """
+        Function to iterate through the records, decoding every record once.
+        Args:
+            start (int): the first record
+            stop (None or int): the record to stop before, the end of the archive if None
+        Yields:
+            generation (int): the generation number of the record
+            cells (numpy.ndarray): the states of the board, 2D boolean array (not to be modified)
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        cells = self.record(start)
+        yield int(self.generations[start]), cells
+        for i in range(start + 1, stop):
+            if self._kinds[i] == KEYFRAME:
+                cells = self._payload(i)
+            else:
+                cells ^= self._payload(i)
+            yield int(self.generations[i]), cells
+        self._cache = (stop - 1, cells.copy())
+
+
+def record_run(path, size=200, density=0.2, seed=None, generations=1000, keyframe_every=100):
+    """
+    Function to run a random board without a display and archive every generation.
+    Args:
+        path (str): the path of the archive file
+        size (int): the width and height of the board
+        density (float): the proportion of living cells
+        seed (None or int): the seed of the random board
+        generations (int): the number of generations
+        keyframe_every (int): the number of records between two keyframes
+    """
+    board = board_script.create_board(size, size, density, np.random.default_rng(seed))
+    writer = ArchiveWriter(path, size, size, keyframe_every)
+    for generation in range(generations + 1):
+        writer.append(generation, board[:, :, states])
+        board_script.update_board(board)
+    writer.close()
+
+
+def view(path, size=(800, 800)):
+    """
+    Function to play an archive back in a pygame window.
+    Space pauses, the arrow keys step one generation back / forward (left / right) or jump by a keyframe interval
+    (down / up), Home and End go to the first and the last generation, '+' and '-' change the playback speed.
+    Args:
+        path (str): the path of the archive file
+        size (tuple): the size of the window
+    """
+    import pygame  # imported lazily, the archive does not need a display
+
+    archive = RunArchive(path)
+    if len(archive) == 0:
+        print(f'{path} holds no records, nothing to play')
+        return
+    pygame.display.init()
+    screen = pygame.display.set_mode(size)
+    clock = pygame.time.Clock()
+    cells = pygame.Surface((archive.x, archive.y), depth=8)
+    cells.set_palette([(0, 0, 0)] + [(255, 255, 255)] * 255)
+
+    record, fps, paused, running = 0, 30, False, True
+    frames = archive.stream()
+    shown = None
+    while running:
+        # Block on input while paused, there is nothing to animate
+        events = [pygame.event.wait()] if paused and shown == record else []
+        for event in events + pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+            if event.type == pygame.KEYDOWN:
+                step = {pygame.K_LEFT: -1, pygame.K_RIGHT: 1,
+                        pygame.K_DOWN: -archive.keyframe_every, pygame.K_UP: archive.keyframe_every}.get(event.key)
+                if step is not None:
+                    record, paused = record + step, True
+                if event.key == pygame.K_HOME:
+                    record = 0
+                if event.key == pygame.K_END:
+                    record = len(archive) - 1
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    fps = min(fps * 2, 960)
+                if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    fps = max(fps // 2, 1)
+        record = min(max(record, 0), len(archive) - 1)
+
+        if shown != record:
+            if shown is not None and record == shown + 1:
+                _, states_now = next(frames)  # playing: the next record of the stream
+            else:
+                frames = archive.stream(record)  # seeking: decode from the closest keyframe
+                _, states_now = next(frames)
+            pygame.surfarray.blit_array(cells, states_now.view(np.uint8))
+            screen.blit(pygame.transform.scale(cells, size), (0, 0))
+            pygame.display.set_caption(f"Conway's Game - generation {archive.generations[record]} "
+                                       f"({record + 1}/{len(archive)}){' - paused' if paused else ''}")
+            pygame.display.flip()
+            shown = record
+        if not paused:
+            record = min(record + 1, len(archive) - 1)
+            paused = record == len(archive) - 1 and shown == record
+        clock.tick(fps)
+    pygame.quit()
+
+
+def main(argv=None):
+    """
+    Record, inspect or play back an archive from the command line.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    parser = argparse.ArgumentParser(description="Seekable archive of every generation of a Conway's game of life run")
+    parser.add_argument('mode', choices=['record', 'info', 'view'], help='record a run, or inspect or play an archive')
+    parser.add_argument('path', help='path of the archive file')
+    parser.add_argument('--size', type=int, default=200, help='width and height of the random board (record)')
+    parser.add_argument('--density', type=float, default=0.2, help='proportion of living cells (record)')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random board (record)')
+    parser.add_argument('--generations', type=int, default=1000, help='number of generations (record)')
+    parser.add_argument('--keyframe-every', type=int, default=100, help='records between two keyframes (record)')
+    args = parser.parse_args(argv)
+
+    if args.mode == 'record':
+        start = time.perf_counter()
+        record_run(args.path, args.size, args.density, args.seed, args.generations, args.keyframe_every)
+        print(f'{args.generations + 1} generations archived in {time.perf_counter() - start:.2f} s')
+    if args.mode in ('record', 'info'):
+        archive = RunArchive(args.path)
+        size = os.path.getsize(args.path)
+        if len(archive):
+            generations = f'generations {archive.generations[0]} to {archive.generations[-1]}'
+            per_generation = f' ({size / len(archive):.0f} bytes per generation)'
+        else:  # e.g. a run stopped before its first generation was written
+            generations, per_generation = 'no generations', ''
+        print(f'{len(archive)} records of {archive.x} x {archive.y} cells, {generations}, '
+              f'{len(archive._keyframes)} keyframes, {size / 2 ** 20:.2f} MB{per_generation}'
+              f'{"" if archive.closed else ", not closed (indexed by scanning)"}')
+    if args.mode == 'view':
+        view(args.path)
+
+
+if __name__ == '__main__':
+    main()
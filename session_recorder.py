@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+
+import numpy as np
+
+import board_script
+
+"""
+This script records sessions of the interactive game and replays them without a display, so a slow session can be
+reproduced exactly and turned into a repeatable performance test case.
+A session file is a JSON lines file. The first line is the header with the seed of the random generator of the game
+(which creates the initial board and the boards of 'Restart') and the size of the screen. Every following line is an
+input event with the generation it was applied in and the time since the start of the recording:
+- 'paint': a cell brought to life or killed with the mouse (x, y, value)
+- 'stroke': the cells along strokes of the mouse brought to life or killed (strokes of cells and values, brush)
+- 'pattern': a pattern placed on the board (key in the Menu dictionary, x, y, rotation, mirrored)
+- 'clear' and 'restart': the board cleared or restarted from the menu
+- 'region': a bulk edit of a rectangle with the selection tools (op, box, density of a random fill, RLE of a paste)
+- 'undo' and 'redo': the most recent edit undone or redone (the journal is rebuilt by the replay)
+- 'toggle': any button of the menu toggled (key), recorded for reference only
+The last line marks the end of the session with the final generation and a checksum of the final board.
+The replayer creates the same initial board from the seed, applies the events in the generations they were applied in
+and runs the generations in between at maximum speed, which produces the same boards as the recorded session.
+Usage example:
+    python Interactive_Conways_game.py --record session.jsonl
+    python session_recorder.py session.jsonl
+"""
+
+states = 0
+
+
+def board_checksum(board):
+    """
+    Function to compute a checksum of the states of a board.
+    Args:
+        board (numpy.ndarray): the board, shape (x, y, 2)
+    Returns:
+        checksum (str): the checksum as a hexadecimal string
+    """
+    return hashlib.blake2b(np.packbits(board[:, :, states] != 0).tobytes(), digest_size=16).hexdigest()
+
+
+class SessionRecorder:
+    def __init__(self, path, seed, width, height):
+        """
+        Class to record the input events of a session to a file
+        Args:
+            path (str): the path of the session file
+            seed (int): the seed of the random generator of the game
+            width (int): the width of the screen (the size of the board is derived from it)
+            height (int): the height of the screen
+        """
+        self._file = open(path, 'w')
+        self._lock = threading.Lock()  # events are logged from the main thread and from the simulation worker
+        self._start = time.perf_counter()
+        self._write({'seed': seed, 'width': width, 'height': height})
+
+    def _write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record) + '\n')
+
+    def log(self, generation, event):
+        """
+        Function to record an input event.
+        Args:
+            generation (int): the generation the event was applied in
+            event (dict): the event, with at least the key 'type'
+        """
+        self._write({'gen': int(generation), 't': round(time.perf_counter() - self._start, 4), **event})
+
+    def close(self, generation, board):
+        """
+        Function to mark the end of the session and close the file.
+        Args:
+            generation (int): the final generation
+            board (numpy.ndarray): the final board
+        """
+        self._write({'gen': int(generation), 't': round(time.perf_counter() - self._start, 4), 'type': 'end',
+                     'checksum': board_checksum(board)})
+        self._file.close()
+
+
+def load_session(path):
+    """
+    Function to load a session file.
+    Args:
+        path (str): the path of the session file
+    Returns:
+        header (dict): the seed and the screen size of the session
+        events (list): the events of the session in the order they were applied
+    """
+    with open(path) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    events = sorted(records[1:], key=lambda event: event['gen'])  # stable, keeps the order within a generation
+    return records[0], events
+
+
+def replay(path, step=board_script.update_board):
+    """
+    Function to replay a session without a display at maximum speed.
+    Args:
+        path (str): the path of the session file
+        step (function): the function advancing a board by one generation in place, e.g. board_script.update_board
+    Returns:
+        game (Game): the game with the final board
+        result (dict): the number of generations, the duration, and whether the final board matches the recording
+    """
+    from Interactive_Conways_game import Game  # the game logic runs without a display
+
+    header, events = load_session(path)
+    game = Game(header['width'], header['height'], rng=np.random.default_rng(header['seed']))
+    game.board = board_script.create_board(game.x, game.y, rng=game.rng)
+    end = next((event for event in events if event['type'] == 'end'), None)
+    last = end['gen'] if end is not None else (events[-1]['gen'] if events else 0)
+
+    start = time.perf_counter()
+    i = 0
+    for generation in range(last + 1):
+        # Apply the events of this generation, then compute the next one
+        while i < len(events) and events[i]['gen'] == generation:
+            game.apply_event(events[i])
+            i += 1
+        if generation < last:
+            step(game.board)
+            game.generation += 1
+    duration = time.perf_counter() - start
+
+    result = {'generations': last, 'duration': duration,
+              'matches': end is None or board_checksum(game.board) == end['checksum']}
+    return game, result
+
+
+def main(argv=None):
+    """
+    Replay a session from the command line.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    parser = argparse.ArgumentParser(description="Replay a recorded session of the Conway's game of life")
+    parser.add_argument('session', help='session file recorded with Interactive_Conways_game.py --record')
+    args = parser.parse_args(argv)
+
+    _, result = replay(args.session)
+    print(f"{result['generations']} generations replayed in {result['duration']:.3f} s "
+          f"({result['generations'] / max(result['duration'], 1e-9):.0f} generations per second)")
+    print('final board matches the recording' if result['matches'] else 'final board DOES NOT match the recording')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+import board_script
+from edit_journal import apply_edit
+
+"""
+This script runs the simulation of the Conway's game of life in a dedicated worker thread, so that a slow generation
+does not drop frames and a slow frame does not delay generations.
+The worker keeps three boards (triple buffering). The latest complete generation is published as the front buffer,
+the renderer holds the buffer it is currently drawing, and the worker computes the next generation into the remaining
+one, so the renderer can always draw the latest generation without copying it and without the worker overwriting it
+while it is drawn.
+Edits of the board (mouse clicks, patterns, clear and restart) are queued with queue_edit() and applied by the worker
+between generations, so they never race with the update of the board.
+Optionally the worker also keeps the age and the activity of the cells (for the heatmaps), triple buffered together with
+the boards and updated in the same pass as the board.
+When an archive writer is set, every published board is appended to the archive (see run_archive.py); the writer
+compresses and writes it in its own thread.
+"""
+
+states, counts = 0, 1
+
+
+class SimulationWorker(threading.Thread):
+    def __init__(self, board, delay=0.1, layers=False):
+        """
+        Class to run the simulation in a background thread
+        Args:
+            board (numpy.ndarray): the initial board, shape (x, y, 2)
+            delay (float): the minimal time between two generations in seconds (to slow down the game)
+            layers (bool): whether to keep the age (uint16) and activity (uint8) layers of the cells
+        Attributes:
+            generation (int): the number of generations computed so far
+            delay (float): the minimal time between two generations in seconds
+            recorder (None or SessionRecorder): when set, the events of the edits are recorded once applied
+            journal (None or EditJournal): when set, the edits are recorded for undo / redo
+            archive (None or ArchiveWriter): when set, every published board is appended to the archive
+        """
+        super().__init__(name='SimulationWorker', daemon=True)
+        self.delay = delay
+        self.generation = 0
+        self.recorder = None
+        self.journal = None
+        self.archive = None
+
+        self._buffers = [board, board.copy(), board.copy()]  # three boards for the triple buffering
+        self._front = 0  # index of the latest complete generation
+        self._reading = None  # index of the board the renderer is currently drawing
+        self._lock = threading.Lock()
+        x, y = board.shape[0], board.shape[1]
+        self._ages = [np.zeros((x, y), dtype=np.uint16) for _ in range(3)] if layers else None
+        self._activity = [np.zeros((x, y), dtype=np.uint8) for _ in range(3)] if layers else None
+
+        self._edits = queue.SimpleQueue()  # edits waiting to be applied between generations
+        self._wake = threading.Event()  # set to wake the worker up (edit queued, pause toggled or stop requested)
+        self._paused = False
+        self._stopped = False
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @paused.setter
+    def paused(self, value):
+        if value != self._paused:
+            self._paused = value
+            self._wake.set()
+
+    def latest(self):
+        """
+        Function to get the latest complete generation for drawing.
+        The returned board is not copied; it is not modified by the worker until latest() is called again.
+        Returns:
+            board (numpy.ndarray): the latest complete board
+        """
+        with self._lock:
+            self._reading = self._front
+            return self._buffers[self._front]
+
+    def layers(self):
+        """
+        Function to get the age and activity layers of the board last returned by latest().
+        Returns:
+            ages (None or numpy.ndarray): the number of generations each cell has been alive, None without layers
+            activity (None or numpy.ndarray): the decaying activity of each cell, None without layers
+        """
+        if self._ages is None or self._reading is None:
+            return None, None
+        return self._ages[self._reading], self._activity[self._reading]
+
+    def queue_edit(self, index, value, event=None):
+        """
+        Function to queue an edit of the state layer, applied by the worker before the next generation.
+        Args:
+            index (tuple): the index of the cells in the state layer, e.g. (x, y) or (slice(None), slice(None))
+            value (int, numpy.ndarray or function): the new state(s) of the cells, or a function computing them from
+                the current states of the cells (applied to the latest generation)
+            event (None or dict): the input event causing the edit, recorded with the generation it is applied in; an
+                event of the type 'undo' or 'redo' undoes or redoes the most recent edit of the journal instead
+        """
+        self._edits.put((index, value, event))
+        self._wake.set()
+
+    def stop(self):
+        """
+        Function to stop the worker and wait for it to finish.
+        """
+        self._stopped = True
+        self._wake.set()
+        if self.is_alive():
+            self.join()
+
+    def _back_buffer(self):
+        """
+        Function to pick the board which is neither published nor being drawn.
+        Returns:
+            index (int): the index of the free board
+        """
+        with self._lock:
+            for i in range(len(self._buffers)):
+                if i != self._front and i != self._reading:
+                    return i
+
+    def _apply_edits(self, board):
+        """
+        Function to apply all queued edits to the given board.
+        Args:
+            board (numpy.ndarray): the board the edits are applied to
+        Returns:
+            True if any edit was applied, False otherwise
+        """
+        applied = False
+        while True:
+            try:
+                index, value, event = self._edits.get_nowait()
+            except queue.Empty:
+                return applied
+            try:
+                if not apply_edit(board[:, :, states], index, value, event, self.journal):
+                    continue  # nothing to undo / redo
+            except IndexError:
+                print('Edit outside the board ignored')  # e.g. a pattern placed too close to the border
+                continue
+            if self.recorder is not None and event is not None:
+                self.recorder.log(self.generation, event)
+            applied = True
+
+    def run(self):
+        next_generation = time.perf_counter()
+        while not self._stopped:
+            # Sleep until the next generation is due or until something wakes the worker up
+            timeout = None if self._paused else max(0.0, next_generation - time.perf_counter())
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stopped:
+                break
+
+            step = not self._paused and time.perf_counter() >= next_generation
+            if not step and self._edits.empty():
+                continue
+
+            # Compute the next board in the free buffer
+            back = self._back_buffer()
+            board = self._buffers[back]
+            np.copyto(board, self._buffers[self._front])
+            ages = activity = None
+            if self._ages is not None:
+                ages, activity = self._ages[back], self._activity[back]
+                np.copyto(ages, self._ages[self._front])
+                np.copyto(activity, self._activity[self._front])
+            self._apply_edits(board)
+            if step:
+                board_script.update_board(board, ages, activity)
+                self.generation += 1
+                next_generation = time.perf_counter() + self.delay
+
+            # Publish the new board
+            with self._lock:
+                self._front = back
+            if self.archive is not None:
+                self.archive.append(self.generation, board[:, :, states])
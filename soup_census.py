@@ -0,0 +1,236 @@
+import argparse
+import csv
+import hashlib
+import multiprocessing
+import os
+
+import numpy as np
+
+import board_script
+
+"""
+This script runs a census of random soups for the Conway's game of life without a display.
+Every soup is a random board created by board_script with its own seed, so any soup of the census can be recreated with
+board_script.create_board(x, y, density, np.random.default_rng(seed)).
+Each soup is run until it stabilises, i.e. until a board repeats itself, and is then classified by its final
+population, its period and its lifetime (the generation at which the repeating cycle started):
+- 'dies out': no living cells are left
+- 'still life': the final board does not change any more (period 1)
+- 'oscillating': the final board repeats with a period larger than 1
+- 'unstable': the board did not repeat within the maximal number of generations
+The seeds are split into chunks which are distributed over a process pool. Each worker process reuses its board and
+hashing buffers for all of its soups. Finished chunks are appended to the census file (one row per soup), so a run can
+be stopped at any time (e.g. with ctrl+c) and continued later with the same command: seeds already in the census file
+are skipped. Every row holds the parameters of its soup (size, density and maximal number of generations), and a census
+file is only continued with the parameters it was written with, so a summary never mixes incompatible runs. At the end
+the results are aggregated into a summary file next to the census file.
+Usage example:
+    python soup_census.py --soups 10000 --output census.csv
+"""
+
+FIELDS = ['seed', 'size', 'density', 'max_generations', 'population', 'period', 'lifetime', 'classification']
+
+_buffers = {}  # buffers reused by all soups of a worker process
+
+
+def _init_worker(x, y):
+    """
+    Function to allocate the buffers of a worker process once.
+    Args:
+        x (int): the width of the boards
+        y (int): the height of the boards
+    """
+    _buffers['board'] = np.zeros((x, y, 2), dtype=int)
+    _buffers['states'] = np.zeros((x, y), dtype=np.uint8)  # contiguous copy of the states used for hashing
+
+
+def run_soup(seed, density, max_generations, board=None, states=None):
+    """
+    Function to run a single soup until it stabilises and classify it.
+    Args:
+        seed (int): the seed of the soup
+        density (float): the proportion of living cells in the soup
+        max_generations (int): the maximal number of generations before the soup is classified as unstable
+        board (None or numpy.ndarray): board buffer to be reused, shape (x, y, 2); the worker buffer is used if None
+        states (None or numpy.ndarray): uint8 buffer of shape (x, y) to be reused for hashing the states
+    Returns:
+        row (dict): the result of the soup with the keys given in FIELDS
+    """
+    board = _buffers['board'] if board is None else board
+    states = _buffers['states'] if states is None else states
+    board[:, :, 1] = 0
+    board_script.fill_board(board, density, np.random.default_rng(seed))
+
+    seen = {}  # hash of the states -> generation it was first seen in
+    period, lifetime = 0, max_generations
+    for generation in range(max_generations + 1):
+        np.copyto(states, board[:, :, 0], casting='unsafe')
+        key = hashlib.blake2b(states, digest_size=16).digest()
+        if key in seen:
+            lifetime = seen[key]
+            period = generation - lifetime
+            break
+        seen[key] = generation
+        if generation < max_generations:
+            board_script.update_board(board)
+
+    population = int(np.count_nonzero(board[:, :, 0]))
+    if period == 0:
+        classification = 'unstable'
+    elif population == 0:
+        classification = 'dies out'
+    elif period == 1:
+        classification = 'still life'
+    else:
+        classification = 'oscillating'
+    return {'seed': seed, 'size': board.shape[0], 'density': density, 'max_generations': max_generations,
+            'population': population, 'period': period,
+            'lifetime': lifetime, 'classification': classification}
+
+
+def _run_chunk(args):
+    """
+    Function to run a chunk of soups in a worker process.
+    Args:
+        args (tuple): the seeds of the chunk, the density and the maximal number of generations
+    Returns:
+        rows (list): the results of the soups
+    """
+    seeds, density, max_generations = args
+    return [run_soup(seed, density, max_generations) for seed in seeds]
+
+
+def read_census(path):
+    """
+    Function to read the rows of an existing census file.
+    Incomplete rows (e.g. from a run that was killed while writing) are ignored.
+    Args:
+        path (str): the path of the census file
+    Returns:
+        rows (list): the rows of the census as dictionaries
+    """
+    rows = []
+    if not os.path.exists(path):
+        return rows
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            try:
+                rows.append({'seed': int(row['seed']), 'size': int(row['size']), 'density': float(row['density']),
+                             'max_generations': int(row['max_generations']), 'population': int(row['population']),
+                             'period': int(row['period']), 'lifetime': int(row['lifetime']),
+                             'classification': row['classification']})
+            except (TypeError, ValueError):
+                continue
+    return rows
+
+
+def summarize(rows):
+    """
+    Function to aggregate the census rows by classification and period.
+    Args:
+        rows (list): the rows of the census
+    Returns:
+        summary (list): one dictionary per classification and period with the number of soups, the mean population
+            and the mean and maximal lifetime
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['classification'], row['period']), []).append(row)
+    summary = []
+    for (classification, period), group in sorted(groups.items()):
+        lifetimes = [row['lifetime'] for row in group]
+        summary.append({'classification': classification, 'period': period, 'soups': len(group),
+                        'mean_population': round(sum(row['population'] for row in group) / len(group), 2),
+                        'mean_lifetime': round(sum(lifetimes) / len(group), 2),
+                        'max_lifetime': max(lifetimes)})
+    return summary
+
+
+def run_census(output, soups, start_seed=0, size=100, density=0.2, max_generations=5000, chunk_size=50,
+               processes=None):
+    """
+    Function to run (or continue) a census of random soups on a process pool.
+    Args:
+        output (str): the path of the census file
+        soups (int): the number of soups, seeds start_seed to start_seed + soups - 1 are used
+        start_seed (int): the first seed
+        size (int): the width and height of the boards
+        density (float): the proportion of living cells in the soups
+        max_generations (int): the maximal number of generations of a soup
+        chunk_size (int): the number of soups sent to a worker at once
+        processes (None or int): the number of worker processes, all cores are used if None
+    Returns:
+        summary (list): the aggregated census, see summarize()
+    Raises:
+        ValueError: if the census file was written with other parameters (or by an older version without them)
+    """
+    if os.path.exists(output) and os.path.getsize(output) > 0:
+        with open(output, newline='') as file:
+            header = next(csv.reader(file), [])
+        if header != FIELDS:
+            raise ValueError(f'{output} was written by an older version of the census, use another --output')
+    rows = read_census(output)
+    parameters = {(row['size'], row['density'], row['max_generations']) for row in rows}
+    if parameters - {(size, density, max_generations)}:
+        found = ', '.join(f'size {s}, density {d}, max generations {g}' for s, d, g in sorted(parameters))
+        raise ValueError(f'{output} was written with other parameters ({found}), use the same parameters to continue '
+                         f'it or another --output')
+    done = {row['seed'] for row in rows}
+    todo = [seed for seed in range(start_seed, start_seed + soups) if seed not in done]
+    chunks = [(todo[i:i + chunk_size], density, max_generations) for i in range(0, len(todo), chunk_size)]
+    print(f'{len(done)} soups already in {output}, {len(todo)} soups to run in {len(chunks)} chunks')
+
+    write_header = not os.path.exists(output) or os.path.getsize(output) == 0
+    with open(output, 'a', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        if write_header:
+            writer.writeheader()
+        if chunks:
+            with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(size, size)) as pool:
+                for finished, rows in enumerate(pool.imap_unordered(_run_chunk, chunks), start=1):
+                    writer.writerows(rows)
+                    file.flush()  # keep the progress on disk in case the run is stopped
+                    print(f'chunk {finished}/{len(chunks)} done')
+
+    summary = summarize(read_census(output))
+    summary_path = os.path.splitext(output)[0] + '_summary.csv'
+    with open(summary_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['classification', 'period', 'soups', 'mean_population',
+                                                  'mean_lifetime', 'max_lifetime'])
+        writer.writeheader()
+        writer.writerows(summary)
+    print(f'census summary saved to {summary_path}')
+    return summary
+
+
+def main(argv=None):
+    """
+    Run the census from the command line.
+    Args:
+        argv (None or list): the command line arguments; sys.argv is used if None
+    """
+    parser = argparse.ArgumentParser(description="Census of random soups for the Conway's game of life")
+    parser.add_argument('--output', default='census.csv', help='census file, existing results are continued')
+    parser.add_argument('--soups', type=int, default=1000, help='number of soups')
+    parser.add_argument('--start-seed', type=int, default=0, help='first seed')
+    parser.add_argument('--size', type=int, default=100, help='width and height of the boards')
+    parser.add_argument('--density', type=float, default=0.2, help='proportion of living cells in the soups')
+    parser.add_argument('--max-generations', type=int, default=5000, help='generations before a soup is unstable')
+    parser.add_argument('--chunk-size', type=int, default=50, help='soups sent to a worker at once')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, all cores by default')
+    args = parser.parse_args(argv)
+    try:
+        summary = run_census(args.output, args.soups, args.start_seed, args.size, args.density,
+                             args.max_generations, args.chunk_size, args.processes)
+    except KeyboardInterrupt:
+        print(f'census stopped, run the same command again to continue from {args.output}')
+        return
+    except ValueError as error:
+        print(error)
+        return
+    for entry in summary:
+        print(entry)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import board_script
+
+"""
+Tests of board_script.update_board: a generation allocates no arrays once the scratch buffers of the board size exist,
+so the memory allocated while the board is updated stays a few small views whatever the size of the board.
+Run with:
+    python -m pytest -q
+"""
+
+GENERATIONS = 10
+PEAK_LIMIT = 32 * 1024  # a few KB of views and temporaries, far below the size of any board of the test
+
+
+def allocation_peak(size, layers):
+    """
+    Function to measure the memory allocated while a board is updated, after the scratch buffers were allocated.
+    Args:
+        size (int): the width and height of the board
+        layers (bool): whether the age and activity layers are updated as well
+    Returns:
+        peak (int): the peak of the traced memory during the generations in bytes
+        retained (int): the traced memory still allocated after the generations in bytes
+    """
+    board = board_script.create_board(size, size, 0.3, np.random.default_rng(0))
+    ages = np.zeros((size, size), dtype=np.uint16) if layers else None
+    activity = np.zeros((size, size), dtype=np.uint8) if layers else None
+    board_script.update_board(board, ages, activity)  # allocates the scratch buffers of the board size
+
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for _ in range(GENERATIONS):
+            board_script.update_board(board, ages, activity)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - start, current - start
+
+
+@pytest.mark.parametrize('layers', [False, True])
+def test_update_board_allocations_are_bounded(layers):
+    small_peak, small_retained = allocation_peak(500, layers)
+    large_peak, large_retained = allocation_peak(2000, layers)
+
+    assert small_peak < PEAK_LIMIT and large_peak < PEAK_LIMIT
+    assert abs(large_peak - small_peak) < 1024  # independent of the size of the board
+    assert small_retained < 1024 and large_retained < 1024  # nothing accumulates over the generations
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (2, 2), (2, 5), (5, 2)])
+def test_update_board_without_inner_cells(shape):
+    board = np.ones(shape + (2,), dtype=np.int64)
+    board_script.update_board(board)
+
+    assert np.all(board[:, :, 0] == 1)  # the edge cells are never updated
+    assert np.all(board[:, :, 1] == 0)
+
+
+def test_update_board_single_inner_cell():
+    board = np.ones((3, 3, 2), dtype=np.int64)
+    board_script.update_board(board)
+
+    assert board[1, 1, 0] == 0 and board[1, 1, 1] == 8  # overcrowded
+    assert board[:, :, 0].sum() == 8
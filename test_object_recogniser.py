@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import board_script
+from object_recogniser import PATTERN_SCRIPTS, ObjectRecogniser
+
+"""
+Tests of object_recogniser: the patterns of the pattern scripts of the game are each named as one object when they are
+placed on an empty board, in any orientation, including the objects made of several clusters (glider gun, Soba).
+Run with:
+    python -m pytest -q
+"""
+
+SIZE = 200
+
+
+@pytest.fixture(scope='module')
+def recogniser():
+    return ObjectRecogniser()
+
+
+def placed(pattern):
+    """
+    Function to place a pattern in the middle of an empty board.
+    Args:
+        pattern (numpy.ndarray): the pattern (2D, nonzero is alive)
+    Returns:
+        board (numpy.ndarray): the board with the pattern
+    """
+    board = np.zeros((SIZE, SIZE, 2), dtype=np.int64)
+    x, y = (SIZE - pattern.shape[0]) // 2, (SIZE - pattern.shape[1]) // 2
+    board[x:x + pattern.shape[0], y:y + pattern.shape[1], 0] = pattern
+    return board
+
+
+@pytest.mark.parametrize('name', ['glider gun', 'pulsar', 'Soba spaceship'])
+@pytest.mark.parametrize('orientation', range(8))
+def test_fresh_pattern_is_named(recogniser, name, orientation):
+    pattern = board_script.load_pattern(PATTERN_SCRIPTS[name])
+    pattern = np.rot90(pattern.T if orientation >= 4 else pattern, orientation % 4)
+    assert recogniser.census(placed(pattern)) == {name: 1}
+
+
+@pytest.mark.parametrize('name', ['glider gun', 'pulsar', 'Soba spaceship'])
+def test_running_pattern_is_named(recogniser, name):
+    board = placed(board_script.load_pattern(PATTERN_SCRIPTS[name]))
+    for _ in range(60):
+        board_script.update_board(board)
+    census = recogniser.census(board)
+    assert census.pop(name) == 1
+    assert set(census) <= {'glider'}  # the gliders emitted by the gun far enough from it are objects of their own